@@ -3,11 +3,35 @@ import pandas as pd
 import numpy as np
 from collections import Counter
 import re
+from functools import partial
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import DBSCAN
+
+from approximate import estimate_sentiment
+from budget import MIN_CHUNK_ROWS, bytes_per_row, category_columns, downcast_integers, plan, sample_frames
+from cancellation import checkpoint
+from columnar import is_columnar, read_columns, read_sample, iter_frames, schema_info
+from columnar import input_size as columnar_input_size
+from compression import is_compressed, read_head, uncompressed_size
+from dedup import find_duplicates
+from geo import GeoGrid, cluster_points
+from groups import GroupAccumulator
+from instrument import StageTimings, NO_TIMINGS
+from progress import emit
+from progress import enabled as progress_enabled
+from review_store import ReviewStoreWriter
+from sentiment import get_scorer, sentiment_summary
+from streaming import NumericAccumulator, TextAccumulator, exact_float, exact_floats
+from textrank import representative_reviews
+from trends import TrendAccumulator, engagement_columns, polarity_labels
 
 
 TEXT_COL_THRESHOLD = 0.4 # fraction of columns that are text to consider dataset text-heavy
+DEFAULT_CHUNKSIZE = 50000 # rows per chunk in chunked mode
+DETECT_SAMPLE_SIZE = 50 # non-null values inspected per column by detect_columns
+SNIFF_ROWS = 2000 # head rows read to detect column types before the full CSV read
+ROW_ESTIMATE_BYTES = 1024 * 1024 # head of a CSV whose line lengths estimate its row count
+ASSUMED_ROW_BYTES = 100 # for Arrow streams, which do not record their row count
+LATLON_PATTERN = re.compile(r"lat|lon|latitude|longitude")
 
 
 
@@ -22,128 +46,748 @@ def is_float_col(s):
 
 
 
-def detect_columns(df: pd.DataFrame):
-    """Return detected column types: 'text', 'numeric', 'latlon'"""
+def head_non_null(series: pd.Series, n: int):
+    """First n non-null values of a series, without scanning the whole column"""
+    values = series.to_numpy()
+    window = n
+    while True:
+        head = values[:window]
+        head = head[pd.notna(head)]
+        if len(head) >= n or window >= len(values):
+            return head[:n]
+        window *= 4
+
+
+def detect_columns(df: pd.DataFrame, sample_size=DETECT_SAMPLE_SIZE):
+    """Return detected column types: 'text', 'numeric', 'latlon', 'datetime', 'categorical'"""
     col_types = {}
+    samples = {}
     for c in df.columns:
-        sample = df[c].dropna().astype(str).head(50)
         # simple lat/lon detection
-        if any(re.search(r"lat|lon|latitude|longitude", c.lower()) for _ in [c]):
+        if LATLON_PATTERN.search(str(c).lower()):
             col_types[c] = 'latlon'
             continue
-        # numeric ratio
-        numeric_count = sample.apply(lambda x: is_float_col(x)).sum()
-        if numeric_count / max(1, len(sample)) > 0.8:
-            col_types[c] = 'numeric'
-        else:
-            avg_len = sample.apply(lambda x: len(x.split())).mean() if len(sample) else 0
-            if avg_len > 2:
+        col_types[c] = 'categorical'
+        if pd.api.types.is_datetime64_any_dtype(df[c]):
+            col_types[c] = 'datetime'
+            continue
+        if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c]):
+            if len(head_non_null(df[c], 1)):
+                col_types[c] = 'numeric'
+            continue
+        samples[c] = head_non_null(df[c], sample_size)
+
+    if samples:
+        # classify every remaining column with one vectorized pass over all samples
+        sizes = np.array([len(v) for v in samples.values()])
+        labels = np.repeat(np.arange(len(samples)), sizes)
+        values = pd.Series(np.concatenate(list(samples.values())), dtype=object).astype(str)
+        is_numeric = pd.notna(pd.to_numeric(values.to_numpy(), errors='coerce'))
+        word_counts = values.str.count(r'\S+').to_numpy(dtype='float64')
+        numeric_ratio = np.bincount(labels, weights=is_numeric, minlength=len(sizes)) / np.maximum(sizes, 1)
+        avg_len = np.bincount(labels, weights=word_counts, minlength=len(sizes)) / np.maximum(sizes, 1)
+        for i, c in enumerate(samples):
+            if numeric_ratio[i] > 0.8:
+                col_types[c] = 'numeric'
+            elif avg_len[i] > 2:
                 col_types[c] = 'text'
-            else:
-                col_types[c] = 'categorical'
+            elif is_datetime_sample(samples[c]):
+                col_types[c] = 'datetime'
     return col_types
 
 
+def is_datetime_sample(values):
+    """True if most values are timestamps (with digits, so month or weekday names stay categorical)"""
+    values = pd.Series(values, dtype=object).astype(str)
+    if not len(values):
+        return False
+    parsed = pd.to_datetime(values, errors='coerce', format='mixed').notna()
+    return bool((parsed & values.str.contains(r'\d')).mean() > 0.8)
+
+
 
 
-def top_keywords(texts, k=10):
+def tfidf_matrix(texts):
+    """Return (X, terms) for texts, or (None, []) when there is nothing to vectorize"""
     if not texts:
-        return []
+        return None, []
     vec = TfidfVectorizer(stop_words='english', max_features=2000)
-    X = vec.fit_transform(texts)
+    try:
+        X = vec.fit_transform(texts)
+    except ValueError:
+        # only stop words
+        return None, []
+    return X, vec.get_feature_names_out()
+
+
+def top_keywords(texts, k=10, tfidf=None):
+    """Top k TF-IDF terms; pass tfidf=tfidf_matrix(texts) to reuse a matrix"""
+    X, terms = tfidf if tfidf is not None else tfidf_matrix(texts)
+    if X is None:
+        return []
     sums = np.asarray(X.sum(axis=0)).ravel()
-    terms = vec.get_feature_names_out()
     top_idx = np.argsort(sums)[-k:][::-1]
     return [terms[i] for i in top_idx]
 
 
 
 
-def analyze_text_column(series: pd.Series, max_samples=200, include_all_reviews=False):
-    """Return simple statistics and keyword/sentiment placeholders for a text column"""
+def text_features(reviews_list, timings=NO_TIMINGS):
+    """
+    Duplicate grouping, TF-IDF over one text per near-duplicate group and the
+    polarity of every review, shared by the column and per-group analyses.
+    Sentiment scores each distinct text once and fans the polarity back out.
+    """
+    with timings.stage('text.dedup'):
+        dups = find_duplicates(reviews_list)
+        unique = dups.unique(reviews_list)
+    with timings.stage('text.keywords'):
+        tfidf = tfidf_matrix(unique)
+    with timings.stage('text.sentiment'):
+        polarity, _ = get_scorer().score(dups.distinct(reviews_list))
+        polarity = dups.fan_out_distinct(polarity)
+    return dups, unique, tfidf, polarity
+
+
+def approximate_features(reviews_list, ci_width, timings=NO_TIMINGS, column=None):
+    """
+    text_features() of the sample estimate_sentiment() scores to reach
+    ci_width, plus its estimate (see approximate.py)
+    """
+    with timings.stage('text.sentiment'):
+        estimate, order, polarity = estimate_sentiment(reviews_list, ci_width, column=column)
+    sample = [reviews_list[i] for i in order]
+    with timings.stage('text.dedup'):
+        dups = find_duplicates(sample)
+        unique = dups.unique(sample)
+    with timings.stage('text.keywords'):
+        tfidf = tfidf_matrix(unique)
+    return (dups, unique, tfidf, polarity), sample, estimate
+
+
+def analyze_text_column(series: pd.Series, max_samples=200, include_all_reviews=False, review_sink=None,
+                        timings=NO_TIMINGS, features=None, ci_width=None):
+    """
+    Return simple statistics, keywords and sentiment for a text column.
+    Unless include_all_reviews is set, only a bounded sample of reviews is
+    returned; review_sink (if given) receives the full list instead.
+    Pass features=text_features(...) of the same reviews to reuse them.
+
+    With ci_width set (and no features) the column is only sampled: reviews
+    are scored until each sentiment share is known to within ci_width, and
+    word counts, keywords and duplicates come from the scored sample. The
+    sentiment block then has an 'approximate' entry with the intervals.
+    """
     s = series.dropna().astype(str)
     n = len(s)
+    reviews_list = s.tolist()
+    estimate = None
+    if ci_width and features is None:
+        features, scored, estimate = approximate_features(reviews_list, ci_width, timings, column=series.name)
     
-    # If include_all_reviews is True, use all reviews for better analysis
+    # If include_all_reviews is True, return every review in the report
     if include_all_reviews or n <= max_samples:
-        reviews_list = s.tolist()
+        sample = reviews_list
     else:
         # Sample reviews for display, but we'll still process all for keywords
-        reviews_list = s.tolist()
         sample = s.sample(n=min(n, max_samples), random_state=42).tolist()
     
-    avg_len = np.mean([len(x.split()) for x in reviews_list]) if reviews_list else 0
+    words = scored if estimate is not None else reviews_list
+    avg_len = np.mean([len(x.split()) for x in words]) if words else 0
     
-    # Use all reviews for keyword extraction for better insights
-    keywords = top_keywords(reviews_list, k=8)
+    # Keywords see one text per near-duplicate group; sentiment covers every review
+    dups, unique, tfidf, polarity = features or text_features(reviews_list, timings)
+    with timings.stage('text.keywords'):
+        keywords = top_keywords(unique, k=8, tfidf=tfidf)
+    with timings.stage('text.representative'):
+        representative = representative_reviews(unique, tfidf[0]) if tfidf[0] is not None else unique[:5]
+    
+    if review_sink is not None:
+        with timings.stage('text.store'):
+            review_sink(reviews_list)
     
     return {
         'n_reviews': n,
         'avg_length_words': float(avg_len),
-        'sample_reviews': reviews_list,  # Return all reviews, not just samples
+        'sample_reviews': sample,
         'keywords': keywords,
+        'representative_reviews': representative,
+        'sentiment': estimate if estimate is not None else sentiment_summary(polarity),
+        'duplicates': dups.summary(),
     }
 
 def analyze_numeric_column(series: pd.Series):
     s = pd.to_numeric(series, errors='coerce')
+    # float32 columns (Parquet/Arrow) are upcast by their decimal form for the moments
+    values = pd.Series(exact_floats(s.to_numpy()))
     return {
         'count': int(s.count()),
-        'mean': float(s.mean()) if s.count() else None,
-        'std': float(s.std()) if s.count() else None,
-        'min': float(s.min()) if s.count() else None,
-        'max': float(s.max()) if s.count() else None,
+        'mean': float(values.mean()) if s.count() else None,
+        'std': float(values.std()) if s.count() else None,
+        'min': exact_float(s.min()) if s.count() else None,
+        'max': exact_float(s.max()) if s.count() else None,
         'top_5_values': list(s.value_counts().head(5).index.astype(str))
     }
 
+def cluster_coords(coords):
+    """Top dense clusters (centroid, radius in meters) of an (n, 2) array of lat/lon points"""
+    return cluster_points(coords)
+
+def gps_values(df, lat_col, lon_col):
+    coords = df[[lat_col, lon_col]].dropna()
+    return coords.apply(pd.to_numeric, errors='coerce').dropna().values
+
 def analyze_gps(df, lat_col, lon_col):
-    # simple clustering to find densest cluster
-    coords = df[[lat_col, lon_col]].dropna().astype(float).values
-    res = {'n_points': int(len(coords))}
-    if len(coords) >= 3:
+    try:
+        return cluster_coords(gps_values(df, lat_col, lon_col))
+    except Exception:
+        return {'n_points': 0}
+
+
+
+
+def gps_columns(col_types):
+    """(lat column, lon column) among the 'latlon' columns, or None"""
+    latlon = [c for c, t in col_types.items() if t == 'latlon']
+    lat_cols = [c for c in latlon if 'lat' in c.lower()]
+    lon_cols = [c for c in latlon if c not in lat_cols[:1] and re.search('lon|lng', c.lower())]
+    if lat_cols and lon_cols:
+        return lat_cols[0], lon_cols[0]
+    return None
+
+
+def needed_columns(col_types, group_by=()):
+    """Columns the pipeline reads: everything but categorical, plus postSentiment and the group-by columns"""
+    return [c for c, t in col_types.items() if t != 'categorical' or c == 'postSentiment' or c in group_by]
+
+
+def csv_dtypes(head, col_types, columns):
+    """
+    read_csv dtypes for the analyzed columns: category for categorical ones
+    and for text/datetime columns that repeat values in the head. Integer
+    columns are downcast after the read (downcast_integers). Float columns
+    stay float64: the head cannot vouch for the rest of the file, and a
+    narrowed value would change every statistic computed from it.
+    """
+    dtype = {c: 'category' for c in category_columns(head, col_types, columns)}
+    for c in columns:
+        if col_types[c] == 'categorical':
+            dtype[c] = 'category'
+    return dtype
+
+
+def _sniff_csv(path, encoding, group_by=()):
+    """
+    First pass of a CSV read: column types from the head of the file, and the
+    usecols/dtype arguments that read only the analyzed columns in the second
+    """
+    head = pd.read_csv(path, encoding=encoding, on_bad_lines='warn', nrows=SNIFF_ROWS)
+    col_types = detect_columns(head)
+    # read_csv with an empty usecols returns no rows, so keep one column for the row count
+    usecols = needed_columns(col_types, group_by) or list(head.columns[:1])
+    return col_types, int(head.shape[1]), {'usecols': usecols, 'dtype': csv_dtypes(head, col_types, usecols)}
+
+
+def _read_csv_projected(path, encoding, timings=NO_TIMINGS, group_by=()):
+    """(df of the analyzed columns, col_types, n_cols); a full untyped read if the projection fails"""
+    with timings.stage('detect'):
+        col_types, n_cols, projection = _sniff_csv(path, encoding, group_by)
+    with timings.stage('read_csv'):
         try:
-            cl = DBSCAN(eps=0.001, min_samples=3).fit(coords)
-            labels = cl.labels_
-            counts = Counter(labels[labels >= 0])
-            if counts:
-                top_label = counts.most_common(1)[0][0]
-                cluster_coords = coords[labels == top_label]
-                centroid = list(cluster_coords.mean(axis=0))
-                res.update({'top_cluster_count': int(counts[top_label]), 'top_cluster_centroid': centroid})
+            df = pd.read_csv(path, encoding=encoding, on_bad_lines='warn', **projection)
+        except UnicodeDecodeError:
+            raise
+        except ValueError:
+            # values further down that do not parse as the head's dtype (or duplicate header names)
+            df = pd.read_csv(path, encoding=encoding, on_bad_lines='warn')
+            col_types, n_cols = None, int(df.shape[1])
+    return df, col_types, n_cols
+
+
+def input_size(path: str) -> int:
+    """Bytes the pipeline will parse, for choosing chunked mode (uncompressed for .gz/.bz2/.zst and Parquet)"""
+    if is_compressed(path):
+        return uncompressed_size(path)
+    return columnar_input_size(path)
+
+
+def estimate_rows(path: str) -> int:
+    """
+    Rows in a file without parsing it: from the metadata of Parquet/Arrow
+    files, else the input size over the mean line length of the first MB
+    (exact for CSVs smaller than that; quoted multi-line reviews count extra)
+    """
+    if is_columnar(path):
+        _, rows = schema_info(path)
+        if rows is not None:
+            return rows
+        return input_size(path) // ASSUMED_ROW_BYTES
+    head = read_head(path, ROW_ESTIMATE_BYTES)
+    lines = head.count(b'\n') + (1 if head and not head.endswith(b'\n') else 0)
+    if len(head) < ROW_ESTIMATE_BYTES:
+        return max(lines - 1, 0)
+    return int(input_size(path) * lines / len(head))
+
+
+def _estimated_rows(path):
+    """estimate_rows for the progress events; None if the file cannot be read"""
+    try:
+        return int(estimate_rows(path))
+    except Exception:
+        return None
+
+
+def _detect_columnar(path):
+    """(col_types, n_cols) of a Parquet/Feather/Arrow file from its schema and first rows"""
+    names, _ = schema_info(path)
+    return detect_columns(read_sample(path)), len(names)
+
+
+def group_accumulator(group_by, col_types, report):
+    """
+    GroupAccumulator for the group_by columns, or None without grouping.
+    Unknown columns are reported under report['groups'] instead.
+    """
+    if not group_by:
+        return None
+    missing = [c for c in group_by if c not in col_types]
+    if missing:
+        report['groups'] = {'by': list(group_by), 'error': f"Column(s) not found: {', '.join(missing)}"}
+        return None
+    return GroupAccumulator(group_by)
+
+
+def trend_accumulators(col_types, has_sentiment):
+    """TrendAccumulator per datetime column, summing the engagement columns"""
+    engagement = engagement_columns(col_types)
+    return {
+        c: TrendAccumulator(c, engagement, with_sentiment=has_sentiment)
+        for c, t in col_types.items() if t == 'datetime'
+    }
+
+
+def row_sentiment(frame, text_cols, polarity):
+    """
+    Sentiment label per row for the trends: the postSentiment column if there
+    is one, else the polarity of the first text column (None without either)
+    """
+    if 'postSentiment' in frame.columns:
+        return frame['postSentiment']
+    if not text_cols or polarity is None:
+        return None
+    labels = pd.Series(np.nan, index=frame.index, dtype=object)
+    labels[frame[text_cols[0]].notna().to_numpy()] = polarity_labels(polarity)
+    return labels
+
+
+def sentiment_data(counts, total):
+    return {
+        'positive': int(counts.get('positive', 0)),
+        'neutral': int(counts.get('neutral', 0)),
+        'negative': int(counts.get('negative', 0)),
+        'total': int(total)
+    }
+
+
+def analyze_csv(path: str, chunksize: int = None, compact: bool = False, review_store_dir: str = None,
+                timings: StageTimings = None, group_by=None, memory_budget_mb: float = None,
+                sentiment_ci_width: float = None):
+    """
+    Analyze a CSV file. With chunksize set, the file is streamed in chunks of
+    that many rows and peak memory no longer grows with the row count.
+    Column types are detected on the head of the file first, so that only the
+    columns the pipeline uses are parsed, with compact dtypes. Parquet, Feather
+    and Arrow IPC files (see columnar.py) are read the same way, and .csv.gz,
+    .csv.bz2 and .csv.zst files are decompressed as they are parsed.
+
+    compact=True keeps only a bounded sample of reviews in the report; pass
+    review_store_dir to persist the full review set (see review_store.py).
+    Per-stage wall time and peak RSS are added under report['_timings'];
+    pass timings to keep adding stages (e.g. the summary) after this returns.
+
+    group_by (a list of column names, e.g. ['eventName', 'platform']) adds
+    report['groups']: the same statistics per distinct combination of their
+    values, computed in the same pass (see groups.py).
+
+    memory_budget_mb caps the peak RSS of the analysis instead: the peak is
+    estimated from a sampled parse and the file is analyzed in memory, in
+    chunks of a size that fits (chunksize is then the largest allowed), or
+    from a uniform sample of its rows. report['_memory'] has the estimate
+    and the strategy chosen (see budget.py).
+
+    sentiment_ci_width makes the in-memory and sampled analyses approximate:
+    text columns are sampled until their sentiment shares are known to
+    within that width (see approximate.py). Per-group text statistics and
+    polarity trends need every review scored, so they are left out; chunked
+    analyses always score every review.
+    """
+    timings = timings or StageTimings()
+    group_by = list(group_by or [])
+    if progress_enabled():
+        emit('start', estimated_rows=_estimated_rows(path))
+    memory = None
+    if memory_budget_mb:
+        with timings.stage('plan'):
+            memory = plan_memory(path, memory_budget_mb, chunksize or DEFAULT_CHUNKSIZE, group_by)
+        if memory is not None:
+            chunksize = memory.get('chunksize')
+    writer = ReviewStoreWriter(review_store_dir) if review_store_dir else None
+    try:
+        if memory is not None and memory['strategy'] == 'sampled':
+            report = _analyze_csv_sampled(path, memory, compact, writer, timings, group_by, sentiment_ci_width)
+        elif chunksize:
+            report = analyze_csv_chunked(path, chunksize, writer, timings, group_by)
+        else:
+            report = _analyze_csv_in_memory(path, compact, writer, timings, group_by, sentiment_ci_width)
+    finally:
+        if writer is not None:
+            writer.close()
+    if 'error' not in report:
+        if memory is not None:
+            report['_memory'] = memory
+        report['_timings'] = timings.as_dict(report['n_rows'])
+    return report
+
+
+def plan_memory(path, budget_mb, max_chunk_rows, group_by=()):
+    """
+    The '_memory' plan for analyzing path within budget_mb (see budget.py),
+    from a parse of its head with the dtypes of the real read; None if the
+    head cannot be read (the analysis then reports the error)
+    """
+    try:
+        if is_columnar(path):
+            col_types, _ = _detect_columnar(path)
+            sample = read_sample(path)[needed_columns(col_types, group_by)]
+            sample = sample.astype({c: 'category' for c in category_columns(sample, col_types, sample.columns)})
+        else:
+            try:
+                col_types, _, projection = _sniff_csv(path, 'utf-8', group_by)
+                sample = pd.read_csv(path, encoding='utf-8', on_bad_lines='warn', nrows=SNIFF_ROWS, **projection)
+            except UnicodeDecodeError:
+                col_types, _, projection = _sniff_csv(path, 'latin-1', group_by)
+                sample = pd.read_csv(path, encoding='latin-1', on_bad_lines='warn', nrows=SNIFF_ROWS, **projection)
+        downcast_integers(sample, [c for c, t in col_types.items() if t == 'numeric'])
+        text_cols = [c for c, t in col_types.items() if t == 'text']
+        return plan(budget_mb, estimate_rows(path), bytes_per_row(sample, text_cols), max_chunk_rows)
+    except Exception:
+        return None
+
+
+def _analyze_csv_in_memory(path, compact, writer, timings=NO_TIMINGS, group_by=(), ci_width=None):
+    if is_columnar(path):
+        # detect on the first rows, then load only the columns that get analyzed
+        try:
+            with timings.stage('detect'):
+                col_types, n_cols = _detect_columnar(path)
+            with timings.stage('read_csv'):
+                df = read_columns(path, needed_columns(col_types, group_by))
+        except Exception as e:
+            return {'error': f'Failed to read file: {str(e)}'}
+    else:
+        try:
+            df, col_types, n_cols = _read_csv_projected(path, 'utf-8', timings, group_by)
         except Exception:
-            pass
-    return res
+            try:
+                df, col_types, n_cols = _read_csv_projected(path, 'latin-1', timings, group_by)
+            except Exception as e2:
+                return {'error': f'Failed to read CSV: {str(e2)}'}
+
+    return _analyze_frame(df, col_types, n_cols, compact, writer, timings, group_by, ci_width)
+
+
+def _analyze_csv_sampled(path, memory, compact, writer, timings=NO_TIMINGS, group_by=(), ci_width=None):
+    """In-memory analysis of a uniform sample of about memory['sample_rows'] rows, read chunk by chunk"""
+    fraction = min(1.0, memory['sample_rows'] / max(memory['estimated_rows'], 1))
+    chunksize = max(memory['sample_rows'], MIN_CHUNK_ROWS)
+
+    def read(encoding):
+        if is_columnar(path):
+            col_types, n_cols = _detect_columnar(path)
+            read_args = {'usecols': needed_columns(col_types, group_by)}
+        else:
+            col_types, n_cols, read_args = _sniff_csv(path, encoding, group_by)
+        df, rows_read = sample_frames(_read_chunks(path, chunksize, encoding, **read_args), fraction)
+        return df, col_types, n_cols, rows_read
+
+    try:
+        with timings.stage('read_csv'):
+            try:
+                df, col_types, n_cols, rows_read = read('utf-8')
+            except UnicodeDecodeError:
+                df, col_types, n_cols, rows_read = read('latin-1')
+    except Exception as e:
+        return {'error': f'Failed to read CSV: {str(e)}'}
+    memory.update({'sample_rows': int(df.shape[0]), 'rows_read': int(rows_read)})
+    emit('rows', rows=int(rows_read))
+    if rows_read == 0:
+        return {'error': 'empty csv'}
+    return _analyze_frame(df, col_types, n_cols, compact, writer, timings, group_by, ci_width)
 
 
+def emit_text_results(column, result):
+    """Progress events for an analyzed text column: its keywords and sentiment counts"""
+    emit('keywords', column=column, keywords=result['keywords'])
+    sentiment = {k: v for k, v in result['sentiment'].items() if k != 'approximate'}
+    emit('sentiment', column=column, **sentiment)
 
 
-def analyze_csv(path: str):
-    df = pd.read_csv(path)
+def _analyze_frame(df, col_types, n_cols, compact, writer, timings=NO_TIMINGS, group_by=(), ci_width=None):
+    """
+    The in-memory pipeline on a loaded frame (col_types None to detect them
+    on it); ci_width samples the text columns' sentiment (approximate.py)
+    """
     if df.shape[0] == 0:
         return {'error': 'empty csv'}
-    col_types = detect_columns(df)
-    report = {'n_rows': int(df.shape[0]), 'n_cols': int(df.shape[1]), 'columns': col_types, 'analysis': {}}
+    if col_types is None:
+        with timings.stage('detect'):
+            col_types = detect_columns(df)
+    report = {'n_rows': int(df.shape[0]), 'n_cols': n_cols, 'columns': col_types, 'analysis': {}}
+    emit('columns', columns=col_types)
+    emit('rows', rows=report['n_rows'])
+    numeric_cols = [c for c, t in col_types.items() if t == 'numeric']
+    downcast_integers(df, numeric_cols)
+
+    groups = group_accumulator(group_by, col_types, report)
+    if groups is not None:
+        with timings.stage('groups'):
+            codes = groups.update(df, numeric_cols)
 
 
     # Text analysis
     text_cols = [c for c, t in col_types.items() if t == 'text']
+    text_polarity = {}
     for c in text_cols:
-        report['analysis'][c] = analyze_text_column(df[c], include_all_reviews=True)
+        sink = partial(writer.append, c) if writer else None
+        if ci_width:
+            with timings.stage('text'):
+                report['analysis'][c] = analyze_text_column(
+                    df[c], include_all_reviews=not compact, review_sink=sink, timings=timings, ci_width=ci_width
+                )
+            emit_text_results(c, report['analysis'][c])
+            continue
+        with timings.stage('text'):
+            # per-group stats and trends reuse the column's duplicates, TF-IDF and polarity
+            rows = df[c].notna().to_numpy()
+            features = text_features(df[c][rows].astype(str).tolist(), timings)
+            dups, _, (X, terms), text_polarity[c] = features
+            if groups is not None:
+                with timings.stage('groups'):
+                    groups.add_sentiment(c, codes[rows], text_polarity[c])
+                    groups.add_keywords(c, codes[rows], dups.labels, X, terms)
+            report['analysis'][c] = analyze_text_column(
+                df[c], include_all_reviews=not compact, review_sink=sink, timings=timings, features=features
+            )
+        emit_text_results(c, report['analysis'][c])
 
 
     # Numeric analysis
-    numeric_cols = [c for c, t in col_types.items() if t == 'numeric']
     for c in numeric_cols:
-        report['analysis'][c] =analyze_numeric_column(df[c])
+        with timings.stage('numeric'):
+            report['analysis'][c] =analyze_numeric_column(df[c])
 
 
     # latlon
-    lat_cols = [c for c, t in col_types.items() if t == 'latlon' or 'lat' in c.lower()]
-    lon_cols = [c for c, t in col_types.items() if t == 'latlon' or 'lon' in c.lower()]
-    if lat_cols and lon_cols:
-        lat_col = lat_cols[0]
-        lon_col = lon_cols[0]
-        report['analysis']['_gps'] = analyze_gps(df, lat_col, lon_col)
+    gps_cols = gps_columns(col_types)
+    if gps_cols:
+        with timings.stage('gps'):
+            report['analysis']['_gps'] = analyze_gps(df, *gps_cols)
+
+    if 'postSentiment' in df.columns:
+        sentiment_counts = df['postSentiment'].value_counts().to_dict()
+        report['sentiment_data'] = sentiment_data(sentiment_counts, df.shape[0])
+        emit('sentiment', column='postSentiment', **report['sentiment_data'])
+
+    # Time-bucketed trends
+    sentiment = row_sentiment(df, text_cols, text_polarity.get(text_cols[0]) if text_cols else None)
+    trends = trend_accumulators(col_types, sentiment is not None)
+    if trends:
+        with timings.stage('trends'):
+            for acc in trends.values():
+                acc.update(df, sentiment)
+            report['trends'] = {c: acc.result() for c, acc in trends.items()}
+
+    if groups is not None:
+        with timings.stage('groups'):
+            report['groups'] = groups.result()
+
+    return report
+
 
+def _read_chunks(path, chunksize, encoding, usecols=None, dtype=None):
+    if is_columnar(path):
+        return iter_frames(path, usecols, chunksize)
+    return pd.read_csv(path, encoding=encoding, on_bad_lines='warn', chunksize=chunksize, usecols=usecols, dtype=dtype)
+
+
+def _analyze_chunks(path, chunksize, encoding, writer=None, timings=NO_TIMINGS, projected=True, group_by=()):
+    col_types = None
+    n_rows = n_cols = 0
+    text_acc, numeric_acc = {}, {}
+    groups = None
+    group_error = {}
+    trends = {}
+    gps_cols = None
+    gps_grid = GeoGrid()
+    sentiment_counts = None
+    read_args = {}
+    # the head of the file decides which columns get read at all, and as what dtype
+    if is_columnar(path):
+        with timings.stage('detect'):
+            col_types, n_cols = _detect_columnar(path)
+        read_args = {'usecols': needed_columns(col_types, group_by)}
+    elif projected:
+        with timings.stage('detect'):
+            col_types, n_cols, read_args = _sniff_csv(path, encoding, group_by)
+
+    reader = iter(_read_chunks(path, chunksize, encoding, **read_args))
+    started = False
+    while True:
+        with timings.stage('read_csv'):
+            chunk = next(reader, None)
+        if chunk is None:
+            break
+        if not started:
+            started = True
+            if col_types is None:
+                # column types come from the first chunk, like detect_columns' head sample
+                with timings.stage('detect'):
+                    col_types = detect_columns(chunk)
+                n_cols = int(chunk.shape[1])
+            groups = group_accumulator(group_by, col_types, group_error)
+            text_acc = {
+                c: TextAccumulator(review_sink=partial(writer.append, c) if writer else None,
+                                   group_keywords=groups is not None)
+                for c, t in col_types.items() if t == 'text'
+            }
+            numeric_acc = {c: NumericAccumulator() for c, t in col_types.items() if t == 'numeric'}
+            gps_cols = gps_columns(col_types)
+            if 'postSentiment' in chunk.columns:
+                sentiment_counts = Counter()
+            trends = trend_accumulators(col_types, 'postSentiment' in chunk.columns or bool(text_acc))
+            emit('columns', columns=col_types)
+        n_rows += int(chunk.shape[0])
+        if groups is not None:
+            with timings.stage('groups'):
+                codes = groups.update(chunk, list(numeric_acc))
+        text_polarity = {}
+        for c, acc in text_acc.items():
+            with timings.stage('text'):
+                polarity = text_polarity[c] = acc.update(chunk[c], timings)
+            if groups is not None and polarity is not None:
+                with timings.stage('groups'):
+                    groups.add_sentiment(c, codes[chunk[c].notna().to_numpy()], polarity)
+        if trends:
+            text_cols = list(text_acc)
+            sentiment = row_sentiment(chunk, text_cols, text_polarity.get(text_cols[0]) if text_cols else None)
+            with timings.stage('trends'):
+                for acc in trends.values():
+                    acc.update(chunk, sentiment)
+        for c, acc in numeric_acc.items():
+            with timings.stage('numeric'):
+                acc.update(chunk[c])
+        if gps_cols:
+            with timings.stage('gps'):
+                try:
+                    gps_grid.update(gps_values(chunk, *gps_cols))
+                except Exception:
+                    pass
+        if sentiment_counts is not None:
+            sentiment_counts.update(chunk['postSentiment'].value_counts().to_dict())
+        emit('rows', rows=n_rows)
+        for c, acc in text_acc.items():
+            # running counts over the rows read so far
+            emit('sentiment', column=c, **acc.sentiment.result())
+        if sentiment_counts is not None:
+            emit('sentiment', column='postSentiment', **sentiment_data(sentiment_counts, n_rows))
+
+    if text_acc:
+        # second pass over the text columns only, to weight the final vocabulary
+        for acc in text_acc.values():
+            acc.keywords.finalize_vocabulary()
+        if any(acc.keywords.needs_weights for acc in text_acc.values()):
+            usecols = list(text_acc) + [c for c in (groups.group_by if groups else []) if c not in text_acc]
+            with timings.stage('text.keyword_weights'):
+                for chunk in _read_chunks(path, chunksize, encoding, usecols=usecols):
+                    checkpoint()
+                    codes = groups.codes(chunk) if groups is not None else None
+                    for c, acc in text_acc.items():
+                        chunk_groups = acc.update_keyword_weights(chunk[c])
+                        if chunk_groups is not None:
+                            # per-group keywords weigh every near-duplicate group of the chunk
+                            labels, X = chunk_groups
+                            with timings.stage('groups'):
+                                groups.add_keywords(c, codes[chunk[c].notna().to_numpy()], labels, X,
+                                                    acc.keywords.terms)
+
+    return {
+        'col_types': col_types, 'n_rows': n_rows, 'n_cols': n_cols,
+        'text': text_acc, 'numeric': numeric_acc,
+        'gps_cols': gps_cols, 'gps_grid': gps_grid, 'sentiment_counts': sentiment_counts,
+        'groups': groups, 'group_error': group_error.get('groups'), 'trends': trends,
+    }
+
+
+def _analyze_chunks_projected(path, chunksize, encoding, writer=None, timings=NO_TIMINGS, group_by=()):
+    """_analyze_chunks, starting over without usecols/dtypes if a later chunk does not parse as sniffed"""
+    try:
+        return _analyze_chunks(path, chunksize, encoding, writer, timings, group_by=group_by)
+    except UnicodeDecodeError:
+        raise
+    except ValueError:
+        if is_columnar(path):
+            raise
+        if writer is not None:
+            writer.reset()
+        return _analyze_chunks(path, chunksize, encoding, writer, timings, projected=False, group_by=group_by)
+
+
+def analyze_csv_chunked(path: str, chunksize: int = DEFAULT_CHUNKSIZE, writer: ReviewStoreWriter = None,
+                        timings=NO_TIMINGS, group_by=()):
+    """Streaming version of analyze_csv built on mergeable per-column accumulators"""
+    try:
+        state = _analyze_chunks_projected(path, chunksize, 'utf-8', writer, timings, group_by)
+    except UnicodeDecodeError:
+        if writer is not None:
+            # start the review store over with the fallback encoding
+            writer.reset()
+        try:
+            state = _analyze_chunks_projected(path, chunksize, 'latin-1', writer, timings, group_by)
+        except Exception as e2:
+            return {'error': f'Failed to read CSV: {str(e2)}'}
+    except Exception as e:
+        return {'error': f'Failed to read CSV: {str(e)}'}
+
+    if state['n_rows'] == 0:
+        return {'error': 'empty csv'}
+    col_types = state['col_types']
+    report = {'n_rows': state['n_rows'], 'n_cols': state['n_cols'], 'columns': col_types, 'analysis': {}}
+
+    for c, acc in state['text'].items():
+        with timings.stage('text.representative'):
+            report['analysis'][c] = acc.result()
+        emit('keywords', column=c, keywords=report['analysis'][c]['keywords'])
+    for c, acc in state['numeric'].items():
+        report['analysis'][c] = acc.result()
+
+    if state['gps_cols']:
+        # every point was binned chunk by chunk; clustering works on the cell table
+        with timings.stage('gps'):
+            gps = state['gps_grid'].result()
+        report['analysis']['_gps'] = gps
+
+    if state['sentiment_counts'] is not None:
+        report['sentiment_data'] = sentiment_data(state['sentiment_counts'], state['n_rows'])
+
+    if state['trends']:
+        with timings.stage('trends'):
+            report['trends'] = {c: acc.result() for c, acc in state['trends'].items()}
+
+    if state['groups'] is not None:
+        with timings.stage('groups'):
+            report['groups'] = state['groups'].result()
+    elif state['group_error'] is not None:
+        report['groups'] = state['group_error']
 
     return report
 
@@ -154,10 +798,21 @@ if __name__ == '__main__':
     import argparse
     import json
     p = argparse.ArgumentParser()
-    p.add_argument('--csv', required=True)
+    p.add_argument('--csv', required=True, help='CSV (optionally .gz/.bz2/.zst), Parquet, Feather or Arrow IPC file.')
     p.add_argument('--out', default='analysis.json')
+    p.add_argument('--chunksize', type=int, default=None, help='Stream the CSV in chunks of this many rows.')
+    p.add_argument('--compact', action='store_true', help='Only keep a bounded sample of reviews in the report.')
+    p.add_argument('--review-store', default=None, help='Directory to persist the full review set in.')
+    p.add_argument('--group-by', default=None, help='Comma-separated columns to also analyze per group.')
+    p.add_argument('--memory-budget', type=float, default=None,
+                   help='Peak RSS budget in MB; picks in-memory, chunked or sampled analysis to fit it.')
+    p.add_argument('--sentiment-ci-width', type=float, default=None,
+                   help='Sample reviews until sentiment shares are known to within this width (e.g. 0.02).')
     args = p.parse_args()
-    r = analyze_csv(args.csv)
+    group_by = [c.strip() for c in args.group_by.split(',') if c.strip()] if args.group_by else None
+    r = analyze_csv(args.csv, chunksize=args.chunksize, compact=args.compact, review_store_dir=args.review_store,
+                    group_by=group_by, memory_budget_mb=args.memory_budget,
+                    sentiment_ci_width=args.sentiment_ci_width)
     with open(args.out, 'w') as f:
         json.dump(r, f, indent=2)
     print('Saved analysis to', args.out)
\ No newline at end of file
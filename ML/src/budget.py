@@ -0,0 +1,119 @@
+"""
+Memory-budgeted analysis.
+
+Given a budget for the peak RSS of the process running an analysis, the
+peak is estimated before the file is read: the rows of the file (from its
+metadata or line lengths) times the working memory of one row. A row's
+working memory comes from a sampled parse of the head of the file: the
+frame bytes with the compact dtypes below, plus TEXT_WORK_FACTOR bytes per
+byte of review text for tokens, shingles and TF-IDF. The analysis then runs
+
+- 'in_memory' when the whole file fits,
+- 'chunked' with as many rows per chunk as fit next to the accumulators,
+- 'sampled' (a uniform sample of rows, in memory) when not even
+  MIN_CHUNK_ROWS rows fit next to the accumulators,
+
+and the report says which strategy was chosen and why under '_memory'. A
+budget below what MIN_SAMPLE_ROWS rows need is not met; the plan then says
+'over_budget': true.
+
+Compact dtypes: low-cardinality text and timestamp columns are read as
+category (eventDate has one distinct value per file) and integer columns
+are downcast once read (analyzer.csv_dtypes). Float columns stay float64.
+"""
+import numpy as np
+import pandas as pd
+
+from instrument import current_rss_mb
+
+# bytes of working memory per byte of review text (token arrays of the
+# sentiment scorer, dedup shingles, TF-IDF), measured on the sample exports
+# (~6.5 with batched scoring and signatures; 8 leaves headroom)
+TEXT_WORK_FACTOR = 8
+# accumulators, vocabulary and read buffers kept across chunks in chunked mode
+CHUNKED_STATE_MB = 140
+# read buffers and the concatenated sample in sampled mode
+SAMPLED_STATE_MB = 75
+# smallest chunk worth streaming; below this the file is sampled instead
+MIN_CHUNK_ROWS = 2000
+# smallest sample analyzed, whatever the budget
+MIN_SAMPLE_ROWS = 1000
+# object columns with at most this share of distinct values in the head become category
+CATEGORY_MAX_RATIO = 0.5
+
+STRATEGIES = ('in_memory', 'chunked', 'sampled')
+
+
+def category_columns(head: pd.DataFrame, col_types, columns):
+    """Text and datetime columns whose head repeats values enough for category to pay off"""
+    out = []
+    for c in columns:
+        if col_types.get(c) not in ('text', 'datetime') or head[c].dtype != object:
+            continue
+        values = head[c].dropna()
+        if len(values) and values.nunique() <= CATEGORY_MAX_RATIO * len(values):
+            out.append(c)
+    return out
+
+
+def downcast_integers(df: pd.DataFrame, columns):
+    """Downcast integer columns of df in place to the smallest dtype holding their values; returns them"""
+    out = []
+    for c in columns:
+        if c in df.columns and pd.api.types.is_integer_dtype(df[c]) and df[c].dtype.itemsize > 1:
+            narrow = pd.to_numeric(df[c], downcast='integer')
+            if narrow.dtype != df[c].dtype:
+                df[c] = narrow
+                out.append(c)
+    return out
+
+
+def bytes_per_row(sample: pd.DataFrame, text_columns) -> float:
+    """Estimated working memory of one row of sample (already in its compact dtypes)"""
+    if not len(sample):
+        return 0.0
+    frame = sample.memory_usage(deep=True, index=False).sum() / len(sample)
+    text = sum(sample[c].dropna().astype(str).str.len().sum() for c in text_columns if c in sample.columns)
+    return float(frame + TEXT_WORK_FACTOR * text / len(sample))
+
+
+def plan(budget_mb: float, rows: int, row_bytes: float, max_chunk_rows: int):
+    """
+    Strategy for analyzing rows rows of row_bytes each within budget_mb of
+    peak RSS, counting what this process already holds. Returns the
+    '_memory' block: strategy, estimates, and chunksize or sample_rows.
+    """
+    baseline = current_rss_mb()
+    available = (budget_mb - baseline) * 1024 * 1024
+    estimate = rows * row_bytes
+    out = {
+        'budget_mb': budget_mb,
+        'baseline_mb': round(baseline, 1),
+        'estimated_rows': int(rows),
+        'estimated_row_bytes': round(row_bytes, 1),
+        'estimated_mb': round(baseline + estimate / (1024 * 1024), 1),
+    }
+    if estimate <= available:
+        return {**out, 'strategy': 'in_memory'}
+    chunk_rows = int((available - CHUNKED_STATE_MB * 1024 * 1024) // max(row_bytes, 1))
+    if chunk_rows >= MIN_CHUNK_ROWS:
+        return {**out, 'strategy': 'chunked', 'chunksize': min(chunk_rows, max_chunk_rows)}
+    sample_rows = int((available - SAMPLED_STATE_MB * 1024 * 1024) // max(row_bytes, 1))
+    if sample_rows < MIN_SAMPLE_ROWS:
+        out['over_budget'] = True
+    return {**out, 'strategy': 'sampled', 'sample_rows': max(sample_rows, MIN_SAMPLE_ROWS)}
+
+
+def sample_frames(frames, fraction: float, seed: int = 42):
+    """
+    Uniform sample (each row kept with probability fraction) of a stream of
+    frames, concatenated; returns (sample, rows read)
+    """
+    rng = np.random.default_rng(seed)
+    kept, n = [], 0
+    for frame in frames:
+        n += len(frame)
+        kept.append(frame[rng.random(len(frame)) < fraction])
+    if not kept:
+        return pd.DataFrame(), 0
+    return pd.concat(kept, ignore_index=True), n
@@ -0,0 +1,43 @@
+"""
+Progress events of a running analysis.
+
+Like cancellation.py, the caller picks a file path and runs the analysis
+inside reporting(path). The pipeline then appends one JSON line per event
+to it: stage transitions (StageTimings.stage), rows processed, and partial
+results as soon as they are known (column types, keywords, running
+sentiment counts). A file works across the process pool, any number of
+readers can tail it, and a late reader replays what it missed. Outside
+reporting() emit() does nothing.
+"""
+import json
+import time
+from contextlib import contextmanager
+
+# event log of the analysis running in this process (a worker runs one at a time)
+_events = None
+
+
+@contextmanager
+def reporting(path):
+    """Append the enclosed analysis' events to path (no-op for None)"""
+    global _events
+    previous = _events
+    _events = open(path, 'a', encoding='utf-8') if path else None
+    try:
+        yield
+    finally:
+        if _events is not None:
+            _events.close()
+        _events = previous
+
+
+def enabled() -> bool:
+    return _events is not None
+
+
+def emit(event: str, **data):
+    """Append {'event', 'time', **data} as one line (values JSON has no type for become strings)"""
+    if _events is None:
+        return
+    _events.write(json.dumps({'event': event, 'time': round(time.time(), 3), **data}, default=str) + '\n')
+    _events.flush()
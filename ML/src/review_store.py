@@ -0,0 +1,75 @@
+"""
+Compact on-disk store for the full set of reviews behind an analysis.
+
+Each text column is kept as two files: <stem>.bin holds the UTF-8 bytes of
+every review back to back and <stem>.idx holds their int64 end offsets (the
+same layout Arrow uses for string columns). Reading a page of reviews is one
+slice of the offsets plus one contiguous read, whatever the store size.
+"""
+import json
+import os
+
+import numpy as np
+
+INDEX_FILE = "columns.json"
+
+
+class ReviewStoreWriter:
+    """Appends reviews column by column, chunk by chunk"""
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        self._columns = {}
+
+    def append(self, column, texts):
+        entry = self._columns.get(column)
+        if entry is None:
+            entry = {'stem': f'col{len(self._columns)}', 'count': 0, 'bytes': 0}
+            self._columns[column] = entry
+        data = [t.encode('utf-8') for t in texts]
+        ends = entry['bytes'] + np.cumsum([len(d) for d in data], dtype='<i8')
+        stem = os.path.join(self.store_dir, entry['stem'])
+        with open(stem + '.bin', 'ab') as f:
+            f.write(b''.join(data))
+        with open(stem + '.idx', 'ab') as f:
+            f.write(ends.astype('<i8').tobytes())
+        entry['count'] += len(data)
+        entry['bytes'] = int(ends[-1]) if len(data) else entry['bytes']
+
+    def reset(self):
+        """Drop everything written so far (e.g. before re-reading with another encoding)"""
+        for entry in self._columns.values():
+            for ext in ('.bin', '.idx'):
+                path = os.path.join(self.store_dir, entry['stem'] + ext)
+                if os.path.exists(path):
+                    os.remove(path)
+        self._columns = {}
+
+    def close(self):
+        with open(os.path.join(self.store_dir, INDEX_FILE), 'w') as f:
+            json.dump(self._columns, f)
+
+
+def store_columns(store_dir: str):
+    """Return {column: {'stem', 'count', 'bytes'}} for a finished store"""
+    with open(os.path.join(store_dir, INDEX_FILE)) as f:
+        return json.load(f)
+
+
+def read_reviews(store_dir: str, column: str, offset: int = 0, limit: int = 50):
+    """Return (total, reviews[offset:offset + limit]) for one column"""
+    entry = store_columns(store_dir)[column]
+    total = entry['count']
+    if offset >= total or limit <= 0:
+        return total, []
+    stem = os.path.join(store_dir, entry['stem'])
+    ends = np.memmap(stem + '.idx', dtype='<i8', mode='r')
+    stop = min(offset + limit, total)
+    page_ends = np.array(ends[offset:stop])
+    start = int(ends[offset - 1]) if offset > 0 else 0
+    with open(stem + '.bin', 'rb') as f:
+        f.seek(start)
+        data = f.read(int(page_ends[-1]) - start)
+    bounds = np.concatenate([[0], page_ends - start])
+    return total, [data[bounds[i]:bounds[i + 1]].decode('utf-8') for i in range(len(page_ends))]
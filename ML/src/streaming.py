@@ -0,0 +1,316 @@
+"""
+Mergeable per-column accumulators for chunked (constant-memory) analysis.
+
+Each accumulator is fed one chunk at a time with update(), can be combined
+with merge(), and produces the same dict as its in-memory counterpart in
+analyzer.py with result().
+"""
+import math
+import random
+from collections import Counter, deque
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+from dedup import StreamDuplicates
+from instrument import NO_TIMINGS
+from sentiment import get_scorer, sentiment_buckets
+from textrank import representative_reviews
+
+
+def exact_float(x):
+    """float() of a numpy scalar; float32 values keep their shortest decimal form (3.7, not 3.700000047683716)"""
+    return float(str(x)) if isinstance(x, np.float32) else float(x)
+
+
+def exact_floats(values):
+    """exact_float of every element of an array, as float64"""
+    values = np.asarray(values)
+    return values.astype(str).astype('float64') if values.dtype == np.float32 else values.astype('float64')
+
+
+class NumericAccumulator:
+    """Count, Welford mean/variance, min/max and value tallies for a numeric column"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.value_counts = Counter()
+
+    def update(self, series: pd.Series):
+        s = pd.to_numeric(series, errors='coerce').dropna()
+        n = len(s)
+        if n == 0:
+            return
+        values = exact_floats(s.to_numpy())
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        self._combine(n, mean, m2, exact_float(s.min()), exact_float(s.max()))
+        if s.dtype == np.float32:
+            # tally float32 values (Parquet/Arrow) by their decimal form, as in-memory mode prints them
+            s = pd.Series(values)
+        # sort=False keeps first-seen order so ties rank the same as value_counts()
+        self.value_counts.update(s.value_counts(sort=False).to_dict())
+
+    def merge(self, other: 'NumericAccumulator'):
+        if other.count:
+            self._combine(other.count, other.mean, other.m2, other.min, other.max)
+            self.value_counts.update(other.value_counts)
+
+    def _combine(self, n, mean, m2, lo, hi):
+        # Chan et al. parallel variant of Welford's update
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+
+    def result(self):
+        if not self.count:
+            return {'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None, 'top_5_values': []}
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else float('nan')
+        counts = pd.Series(list(self.value_counts.values()), index=list(self.value_counts.keys()))
+        counts = counts.sort_values(ascending=False)
+        return {
+            'count': int(self.count),
+            'mean': float(self.mean),
+            'std': float(std),
+            'min': float(self.min),
+            'max': float(self.max),
+            'top_5_values': list(counts.head(5).index.astype(str))
+        }
+
+
+class KeywordAccumulator:
+    """
+    Two-pass TF-IDF keyword extraction equivalent to top_keywords().
+
+    Pass 1 (update_counts) tallies term and document frequencies, pass 2
+    (update_weights) sums l2-normalised TF-IDF rows over the final vocabulary.
+    Memory is bounded by vocabulary size, not by the number of documents.
+    """
+
+    def __init__(self, max_features=2000):
+        self.max_features = max_features
+        self.n_docs = 0
+        self.term_counts = Counter()
+        self.doc_counts = Counter()
+        self._vectorizer = None
+        self._idf = None
+        self._sums = None
+
+    def update_counts(self, texts):
+        if not texts:
+            return
+        self.n_docs += len(texts)
+        try:
+            vec = CountVectorizer(stop_words='english')
+            X = vec.fit_transform(texts)
+        except ValueError:
+            # chunk made only of stop words
+            return
+        terms = vec.get_feature_names_out()
+        tfs = np.asarray(X.sum(axis=0)).ravel()
+        dfs = np.bincount(X.indices, minlength=len(terms))
+        self.term_counts.update(dict(zip(terms, tfs.tolist())))
+        self.doc_counts.update(dict(zip(terms, dfs.tolist())))
+
+    def merge_counts(self, other: 'KeywordAccumulator'):
+        self.n_docs += other.n_docs
+        self.term_counts.update(other.term_counts)
+        self.doc_counts.update(other.doc_counts)
+
+    def finalize_vocabulary(self):
+        """Pick the max_features most frequent terms, exactly as CountVectorizer does"""
+        terms = sorted(self.term_counts)
+        if len(terms) > self.max_features:
+            tfs = np.array([self.term_counts[t] for t in terms], dtype='int64')
+            keep = np.sort((-tfs).argsort()[:self.max_features])
+            terms = [terms[i] for i in keep]
+        dfs = np.array([self.doc_counts[t] for t in terms], dtype='float64')
+        self._idf = np.log((1 + self.n_docs) / (1 + dfs)) + 1
+        self._vectorizer = CountVectorizer(stop_words='english', vocabulary=terms)
+        self._sums = np.zeros(len(terms))
+        return terms
+
+    @property
+    def needs_weights(self):
+        return bool(self.term_counts)
+
+    @property
+    def terms(self):
+        return self._vectorizer.get_feature_names_out() if self._vectorizer is not None else []
+
+    def transform(self, texts):
+        """l2-normalised TF-IDF rows of texts over the final vocabulary, or None before finalize_vocabulary()"""
+        if not texts or self._vectorizer is None or not len(self._sums):
+            return None
+        X = self._vectorizer.transform(texts).astype('float64')
+        return normalize(X.multiply(self._idf).tocsr())
+
+    def update_weights(self, texts):
+        self.add_weights(self.transform(texts))
+
+    def add_weights(self, X):
+        """Add already-transformed rows (see transform())"""
+        if X is not None:
+            self._sums += np.asarray(X.sum(axis=0)).ravel()
+
+    def top(self, k=10):
+        if self._sums is None or not len(self._sums):
+            return []
+        terms = self._vectorizer.get_feature_names_out()
+        top_idx = np.argsort(self._sums)[-k:][::-1]
+        return [terms[i] for i in top_idx]
+
+
+class ReservoirSample:
+    """Uniform fixed-size sample of a stream (keeps everything while under capacity)"""
+
+    def __init__(self, capacity, seed=42):
+        self.capacity = capacity
+        self.seen = 0
+        self.items = []
+        self._rng = random.Random(seed)
+
+    def update(self, items):
+        for item in items:
+            self.seen += 1
+            if len(self.items) < self.capacity:
+                self.items.append(item)
+            else:
+                j = self._rng.randrange(self.seen)
+                if j < self.capacity:
+                    self.items[j] = item
+
+
+class SentimentAccumulator:
+    """Running pos/neg/neu counts and polarity sum"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.n = 0
+        self.polarity_sum = 0.0
+
+    def update(self, texts):
+        self.add(get_scorer().score(texts)[0])
+
+    def add(self, polarity):
+        """Count already-scored polarities"""
+        self.counts.update(sentiment_buckets(polarity))
+        self.n += len(polarity)
+        self.polarity_sum += float(polarity.sum())
+
+    def merge(self, other: 'SentimentAccumulator'):
+        self.counts.update(other.counts)
+        self.n += other.n
+        self.polarity_sum += other.polarity_sum
+
+    def result(self):
+        return {
+            'positive': int(self.counts['positive']),
+            'negative': int(self.counts['negative']),
+            'neutral': int(self.counts['neutral']),
+            'average_polarity': self.polarity_sum / self.n if self.n else 0.0,
+        }
+
+
+class TextAccumulator:
+    """
+    Review count, word-length sum, bounded review sample, keyword and sentiment
+    state. Sentiment scores each distinct text once and keywords see one text
+    per near-duplicate group (see dedup.py); counts still cover every review.
+
+    The grouping of every chunk is kept for the second keyword pass: the row
+    of the first text of each new group (4 bytes per group), and with
+    group_keywords the group of every row too (4 bytes per review).
+    """
+
+    def __init__(self, max_samples=200, review_sink=None, group_keywords=False):
+        self.n = 0
+        self.word_total = 0
+        self.samples = ReservoirSample(max_samples)
+        self.keywords = KeywordAccumulator()
+        self.sentiment = SentimentAccumulator()
+        self.duplicates = StreamDuplicates()
+        self.group_keywords = group_keywords
+        self._chunk_groups = deque()
+        self.review_sink = review_sink
+
+    def update(self, series: pd.Series, timings=NO_TIMINGS):
+        """Add a chunk; returns the polarity of each of its non-null reviews (None if there are none)"""
+        s = series.dropna().astype(str)
+        if not len(s):
+            return None
+        self.n += len(s)
+        self.word_total += int(s.str.split().str.len().sum())
+        texts = s.tolist()
+        self.samples.update(texts)
+        with timings.stage('text.dedup'):
+            dups, polarity, new_groups = self.duplicates.update(texts)
+        with timings.stage('text.keywords'):
+            unique = dups.unique(texts)
+            self.keywords.update_counts([unique[g] for g in new_groups])
+            if self.group_keywords:
+                self._chunk_groups.append((dups.first.astype(np.int32), new_groups.astype(np.int32),
+                                           dups.labels.astype(np.int32)))
+            else:
+                self._chunk_groups.append((dups.first[new_groups].astype(np.int32), None, None))
+        with timings.stage('text.sentiment'):
+            distinct = dups.distinct(texts)
+            new = np.flatnonzero(np.isnan(polarity))
+            polarity[new] = get_scorer().score([distinct[i] for i in new])[0]
+            self.duplicates.remember(polarity)
+            polarity = dups.fan_out_distinct(polarity)
+            self.sentiment.add(polarity)
+        if self.review_sink is not None:
+            with timings.stage('text.store'):
+                self.review_sink(texts)
+        return polarity
+
+    def update_keyword_weights(self, series: pd.Series):
+        """
+        Second keyword pass over the same chunks, reusing the grouping update()
+        kept for each. With group_keywords returns the chunk's (group of every
+        review, TF-IDF row of every group), otherwise None.
+        """
+        texts = series.dropna().astype(str).tolist()
+        if not texts:
+            return None
+        first, new_groups, labels = self._chunk_groups.popleft()
+        unique = [texts[i] for i in first]
+        if labels is None:
+            self.keywords.update_weights(unique)
+            return None
+        X = self.keywords.transform(unique)
+        if X is not None:
+            self.keywords.add_weights(X[new_groups])
+        return labels, X
+
+    def merge(self, other: 'TextAccumulator'):
+        self.n += other.n
+        self.word_total += other.word_total
+        self.samples.update(other.samples.items)
+        self.keywords.merge_counts(other.keywords)
+        self.sentiment.merge(other.sentiment)
+        self.duplicates.merge(other.duplicates)
+        self._chunk_groups.extend(other._chunk_groups)
+
+    def result(self, k=8):
+        return {
+            'n_reviews': self.n,
+            'avg_length_words': float(self.word_total / self.n) if self.n else 0,
+            'sample_reviews': self.samples.items,
+            'keywords': self.keywords.top(k),
+            # ranked within the bounded sample; the full matrix is never held
+            'representative_reviews': representative_reviews(self.samples.items),
+            'sentiment': self.sentiment.result(),
+            'duplicates': self.duplicates.summary(),
+        }
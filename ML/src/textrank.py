@@ -0,0 +1,62 @@
+"""
+Extractive summarization: TextRank over a TF-IDF matrix.
+
+Each review is a node and edges are the cosine similarities between their
+l2-normalised TF-IDF rows. The n x n similarity matrix is never built: one
+PageRank step needs S @ y = X @ (X.T @ y) - diag(S) * y, which is two sparse
+matrix-vector products, so every iteration is O(nnz(X)).
+"""
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+DAMPING = 0.85
+
+
+def textrank_scores(X, damping=DAMPING, tol=1e-6, max_iter=100):
+    """PageRank score of every row of X (rows are assumed l2-normalised)"""
+    n = X.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    Xt = X.T.tocsr()
+    self_sim = np.asarray(X.multiply(X).sum(axis=1)).ravel()
+    degree = X @ (Xt @ np.ones(n)) - self_sim
+    dangling = degree <= 1e-12
+    inv_degree = np.where(dangling, 0.0, 1.0 / np.where(dangling, 1.0, degree))
+
+    r = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        y = r * inv_degree
+        spread = X @ (Xt @ y) - self_sim * y
+        # reviews sharing no terms with any other hand their rank out uniformly
+        r_next = (1 - damping) / n + damping * (spread + r[dangling].sum() / n)
+        if np.abs(r_next - r).sum() < tol:
+            return r_next
+        r = r_next
+    return r
+
+
+def representative_reviews(texts, X=None, k=5, max_similarity=0.8):
+    """
+    Top k reviews by TextRank, skipping near-duplicates of ones already picked.
+    X is the TF-IDF matrix of texts (as built by top_keywords); it is built
+    here when not given.
+    """
+    if not texts:
+        return []
+    if X is None:
+        try:
+            X = TfidfVectorizer(stop_words='english', max_features=2000).fit_transform(texts)
+        except ValueError:
+            # only stop words
+            return list(texts[:k])
+    X = X.tocsr()
+    scores = textrank_scores(X)
+    picked = []
+    # only look a little past k candidates, so heavy duplication stays cheap
+    for i in np.argsort(-scores, kind='stable')[:k * 20]:
+        if len(picked) == k:
+            break
+        if picked and (X[picked] @ X[i].T).max() > max_similarity:
+            continue
+        picked.append(int(i))
+    return [texts[i] for i in picked]
@@ -2,8 +2,15 @@ import streamlit as st
 import pandas as pd
 import json
 import io
-from src.analyzer import analyze_csv
-from src.summarizer import generate_summary
+import os
+import sys
+
+# The src modules import each other by name (as inference.py and the backend
+# load them), so src itself goes on the path rather than being a package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from analyzer import analyze_csv
+from summarizer import generate_summary
 
 st.set_page_config(
     page_title="Event Review Summarizer",
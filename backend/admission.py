@@ -0,0 +1,177 @@
+"""
+Admission control for analyses that need the process pool.
+
+Every upload that misses the result cache is admitted against an estimated
+cost before it is submitted: the bytes the pipeline will parse plus an
+allowance per row (sentiment, dedup and TF-IDF work grow with rows). The
+controller caps the analyses in flight (queued for a worker or running) and
+the megabytes they add up to. A request over either cap, or over one user's
+share of them, is turned away with 429 and a Retry-After computed from the
+recent processing rate, so a burst backs off at the edge instead of piling
+up behind the workers. While nothing is in flight an analysis is admitted
+however large it is, so oversized files still run, one at a time.
+"""
+import logging
+import math
+import os
+import threading
+from typing import Any, Dict
+
+try:
+    from ml_service import estimate_input
+    from jobs import ANALYSIS_WORKERS
+except ImportError:
+    from backend.ml_service import estimate_input
+    from backend.jobs import ANALYSIS_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Analyses admitted and not finished yet, and the estimated MB of work they hold
+MAX_INFLIGHT_ANALYSES = int(os.getenv("MAX_INFLIGHT_ANALYSES", str(ANALYSIS_WORKERS * 4)))
+MAX_INFLIGHT_MB = float(os.getenv("MAX_INFLIGHT_MB", "1024"))
+
+# Fraction of both caps one user may hold (always at least one analysis)
+ADMISSION_USER_SHARE = float(os.getenv("ADMISSION_USER_SHARE", "0.5"))
+
+# Cost allowance per row on top of the parsed bytes
+ROW_COST_BYTES = 200
+
+# Retry-After bounds, the processing rate assumed until an analysis has
+# finished, and the weight of the newest analysis in the running average
+MIN_RETRY_AFTER_SECONDS = 1
+MAX_RETRY_AFTER_SECONDS = 300
+DEFAULT_SECONDS_PER_MB = 0.5
+RATE_SMOOTHING = 0.2
+
+
+class AdmissionRejected(Exception):
+    """Raised by admit(); reason is 'inflight', 'megabytes' or 'user_share'"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def estimate_cost_mb(path: str) -> float:
+    """Admission cost of an upload in MB: parsed bytes plus ROW_COST_BYTES per estimated row"""
+    try:
+        estimate = estimate_input(path)
+    except Exception as e:
+        # unreadable files fail fast in the pipeline; charge their size on disk
+        logger.warning(f"Could not estimate {path}: {e}")
+        estimate = {"bytes": os.path.getsize(path), "rows": 0}
+    return (estimate["bytes"] + estimate["rows"] * ROW_COST_BYTES) / (1024 * 1024)
+
+
+class Ticket:
+    """Capacity held by one admitted request until release() (safe to call more than once)"""
+
+    def __init__(self, controller: "AdmissionController", user_id: int, slots: int, cost_mb: float):
+        self.controller = controller
+        self.user_id = user_id
+        self.slots = slots
+        self.cost_mb = cost_mb
+        self.released = False
+
+    def release(self):
+        self.controller._release(self)
+
+
+class AdmissionController:
+    """Global and per-user caps on in-flight analyses and their estimated MB"""
+
+    def __init__(self, max_inflight: int = MAX_INFLIGHT_ANALYSES, max_mb: float = MAX_INFLIGHT_MB,
+                 user_share: float = ADMISSION_USER_SHARE, workers: int = ANALYSIS_WORKERS):
+        self.max_inflight = max(1, max_inflight)
+        self.max_mb = max_mb
+        self.user_max_inflight = max(1, int(self.max_inflight * user_share))
+        self.user_max_mb = max_mb * user_share
+        self.workers = max(1, workers)
+        self.seconds_per_mb = None
+        self.inflight = 0
+        self.inflight_mb = 0.0
+        self.rejected = 0
+        self._users: Dict[int, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def admit(self, user_id: int, cost_mb: float, slots: int = 1) -> Ticket:
+        """
+        Hold slots analyses and cost_mb MB for user_id, or raise
+        AdmissionRejected. A user's first request is only held to the global
+        caps, and the first request of an idle server to none.
+        """
+        with self._lock:
+            user = self._users.get(user_id, {"inflight": 0, "mb": 0.0})
+            reason, backlog_mb = None, 0.0
+            if self.inflight > 0:
+                if self.inflight + slots > self.max_inflight:
+                    reason = "inflight"
+                    backlog_mb = self._slots_backlog(self.inflight + slots - self.max_inflight, self.inflight,
+                                                     self.inflight_mb)
+                elif self.inflight_mb + cost_mb > self.max_mb:
+                    reason, backlog_mb = "megabytes", self.inflight_mb + cost_mb - self.max_mb
+            if reason is None and user["inflight"] > 0:
+                if user["inflight"] + slots > self.user_max_inflight:
+                    reason = "user_share"
+                    backlog_mb = self._slots_backlog(user["inflight"] + slots - self.user_max_inflight,
+                                                     user["inflight"], user["mb"])
+                elif user["mb"] + cost_mb > self.user_max_mb:
+                    reason, backlog_mb = "user_share", user["mb"] + cost_mb - self.user_max_mb
+            if reason is not None:
+                self.rejected += 1
+                raise AdmissionRejected(reason, self._retry_after(backlog_mb))
+            self.inflight += slots
+            self.inflight_mb += cost_mb
+            self._users[user_id] = {"inflight": user["inflight"] + slots, "mb": user["mb"] + cost_mb}
+        return Ticket(self, user_id, slots, cost_mb)
+
+    def _release(self, ticket: Ticket):
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            self.inflight -= ticket.slots
+            self.inflight_mb = max(0.0, self.inflight_mb - ticket.cost_mb)
+            user = self._users[ticket.user_id]
+            user["inflight"] -= ticket.slots
+            user["mb"] = max(0.0, user["mb"] - ticket.cost_mb)
+            if user["inflight"] <= 0:
+                del self._users[ticket.user_id]
+
+    def observe(self, seconds: float, cost_mb: float):
+        """Fold a finished analysis (pipeline seconds for cost_mb MB) into the processing rate"""
+        if not seconds or cost_mb <= 0:
+            return
+        rate = seconds / cost_mb
+        with self._lock:
+            if self.seconds_per_mb is None:
+                self.seconds_per_mb = rate
+            else:
+                self.seconds_per_mb += RATE_SMOOTHING * (rate - self.seconds_per_mb)
+
+    @staticmethod
+    def _slots_backlog(excess: int, inflight: int, inflight_mb: float) -> float:
+        """MB that must finish to free excess slots, taking in-flight analyses as equally sized"""
+        return inflight_mb * min(excess, inflight) / max(inflight, 1)
+
+    def _retry_after(self, backlog_mb: float) -> int:
+        """Seconds until backlog_mb of in-flight work has gone through the workers"""
+        rate = self.seconds_per_mb if self.seconds_per_mb is not None else DEFAULT_SECONDS_PER_MB
+        seconds = math.ceil(backlog_mb * rate / self.workers)
+        return min(MAX_RETRY_AFTER_SECONDS, max(MIN_RETRY_AFTER_SECONDS, seconds))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "inflight": self.inflight,
+                "inflight_mb": round(self.inflight_mb, 1),
+                "max_inflight": self.max_inflight,
+                "max_mb": self.max_mb,
+                "users": len(self._users),
+                "rejected": self.rejected,
+                "seconds_per_mb": self.seconds_per_mb,
+            }
+
+
+admission = AdmissionController()
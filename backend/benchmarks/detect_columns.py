@@ -0,0 +1,83 @@
+"""
+Benchmark for analyzer.detect_columns on wide files.
+
+Usage:
+    python benchmarks/detect_columns.py --cols 120 --rows 100000
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ml_src"))
+
+from analyzer import detect_columns, is_float_col  # noqa: E402
+
+
+def detect_columns_per_cell(df: pd.DataFrame):
+    """The original per-cell implementation, kept as the comparison baseline"""
+    col_types = {}
+    for c in df.columns:
+        sample = df[c].dropna().astype(str).head(50)
+        if re.search(r"lat|lon|latitude|longitude", c.lower()):
+            col_types[c] = 'latlon'
+            continue
+        numeric_count = sample.apply(lambda x: is_float_col(x)).sum()
+        if numeric_count / max(1, len(sample)) > 0.8:
+            col_types[c] = 'numeric'
+        else:
+            avg_len = sample.apply(lambda x: len(x.split())).mean() if len(sample) else 0
+            col_types[c] = 'text' if avg_len > 2 else 'categorical'
+    return col_types
+
+
+def make_wide_frame(n_cols: int, n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Mix of numeric, numeric-as-string, categorical and free-text columns"""
+    rng = np.random.default_rng(seed)
+    words = np.array("great event speakers food venue crowded music loved long queue staff".split())
+    data = {}
+    for i in range(n_cols):
+        kind = i % 4
+        if kind == 0:
+            data[f"metric_{i}"] = rng.normal(100, 15, n_rows)
+        elif kind == 1:
+            data[f"count_{i}"] = rng.integers(0, 1000, n_rows).astype(str)
+        elif kind == 2:
+            data[f"category_{i}"] = rng.choice(["instagram", "twitter", "post", "comment"], n_rows)
+        else:
+            data[f"text_{i}"] = [" ".join(rng.choice(words, 6)) for _ in range(n_rows)]
+    return pd.DataFrame(data).astype(object)
+
+
+def time_per_column(fn, df, repeat=3):
+    best = min(_timed(fn, df) for _ in range(repeat))
+    return best / df.shape[1]
+
+
+def _timed(fn, df):
+    start = time.perf_counter()
+    fn(df)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser(description='Benchmark detect_columns per-column cost.')
+    p.add_argument('--cols', type=int, default=120)
+    p.add_argument('--rows', type=int, default=100000)
+    p.add_argument('--csv', default=None, help='Benchmark an existing CSV instead of a synthetic frame.')
+    args = p.parse_args()
+
+    df = pd.read_csv(args.csv) if args.csv else make_wide_frame(args.cols, args.rows)
+    # timestamp columns are 'datetime' now; the baseline had no such type and called them categorical
+    detected = {c: 'categorical' if t == 'datetime' else t for c, t in detect_columns(df).items()}
+    assert detected == detect_columns_per_cell(df), "column types differ from the baseline"
+
+    old = time_per_column(detect_columns_per_cell, df)
+    new = time_per_column(detect_columns, df)
+    print(f"{df.shape[1]} columns x {df.shape[0]} rows")
+    print(f"per-cell   : {old * 1e3:.3f} ms/column")
+    print(f"vectorized : {new * 1e3:.3f} ms/column ({old / new:.1f}x faster)")
@@ -0,0 +1,66 @@
+"""
+Benchmark for grid geo clustering (ml_src/geo.py) against the old DBSCAN path.
+
+Usage:
+    python benchmarks/geo.py --points 1000000 --dbscan-points 50000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ml_src"))
+
+from geo import cluster_points  # noqa: E402
+
+HOTSPOTS = np.array([[12.9716, 77.5946], [12.9352, 77.6245], [60.1699, 24.9384], [40.7580, -73.9855]])
+
+
+def make_checkins(n, seed=42, noise=0.2):
+    """Check-ins around a few venues (~100m spread) plus uniformly scattered noise"""
+    rng = np.random.default_rng(seed)
+    n_noise = int(n * noise)
+    venue = HOTSPOTS[rng.choice(len(HOTSPOTS), size=n - n_noise, p=[0.4, 0.3, 0.2, 0.1])]
+    spread = rng.normal(0, 0.001, size=venue.shape)
+    spread[:, 1] /= np.cos(np.radians(venue[:, 0]))
+    scattered = np.column_stack([rng.uniform(-60, 60, n_noise), rng.uniform(-180, 180, n_noise)])
+    points = np.vstack([venue + spread, scattered])
+    rng.shuffle(points)
+    return points
+
+
+def dbscan_top_cluster(coords):
+    """The previous analyze_gps implementation (degree-space DBSCAN)"""
+    labels = DBSCAN(eps=0.001, min_samples=3).fit(coords).labels_
+    counts = np.bincount(labels[labels >= 0])
+    if not len(counts):
+        return None
+    top = counts.argmax()
+    return int(counts[top]), list(coords[labels == top].mean(axis=0))
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--points", type=int, default=1000000)
+    p.add_argument("--dbscan-points", type=int, default=50000, help="DBSCAN comparison size (0 to skip)")
+    args = p.parse_args()
+
+    coords = make_checkins(args.points)
+    start = time.perf_counter()
+    res = cluster_points(coords)
+    print(f"grid    {args.points:>9} points: {time.perf_counter() - start:.3f}s")
+    for c in res.get("clusters", []):
+        print(f"  {c['count']:>8} pts  centroid=({c['centroid'][0]:.5f}, {c['centroid'][1]:.5f})  radius={c['radius_m']}m")
+
+    if args.dbscan_points:
+        small = coords[:args.dbscan_points]
+        start = time.perf_counter()
+        grid = cluster_points(small)
+        grid_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        dbscan = dbscan_top_cluster(small)
+        print(f"grid    {len(small):>9} points: {grid_seconds:.3f}s  top={grid.get('top_cluster_count')}")
+        print(f"dbscan  {len(small):>9} points: {time.perf_counter() - start:.3f}s  top={dbscan and dbscan[0]}")
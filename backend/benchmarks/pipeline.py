@@ -0,0 +1,224 @@
+"""
+Stage-by-stage and end-to-end benchmark of the analysis pipeline.
+
+`run` generates synthetic CSVs (see synthetic.py) for each shape and scale,
+times every pipeline stage, the whole analyze_csv call (in memory and
+chunked), generate_summary_improved, and POST /api/analyze through an
+in-process ASGI client, and records peak RSS. Each scale runs in a fresh
+process so peak RSS belongs to that scale alone. Results go to a JSON file
+that `compare` diffs against a later run.
+
+Usage:
+    python benchmarks/pipeline.py run --scales 1k,100k --out baseline.json
+    python benchmarks/pipeline.py run --scales 1k,100k,1m --out current.json
+    python benchmarks/pipeline.py compare baseline.json current.json --threshold 0.15
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from synthetic import SHAPES, parse_rows, write_dataset  # noqa: E402
+
+# Stage timings below this are too noisy to flag as regressions
+MIN_COMPARE_SECONDS = 0.05
+
+
+def peak_rss_mb(pid=None):
+    """Peak resident set size of a process (this one by default) in MB"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if pid is None:
+        # ru_maxrss is KB on Linux and bytes on macOS
+        scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+    return None
+
+
+class Timer:
+    """Collects {stage: seconds} for one dataset"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def __call__(self, stage, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.stages[stage] = round(self.stages.get(stage, 0.0) + time.perf_counter() - start, 4)
+        return result
+
+
+def bench_stages(path):
+    """Time every registry stage on one CSV; returns ({stage: seconds}, peak RSS MB)"""
+    import pandas as pd
+    from ml_service import get_pipeline
+    stages = get_pipeline()
+    from analyzer import gps_columns
+
+    timer = Timer()
+    df = timer("read_csv", pd.read_csv, path)
+    col_types = timer("detect", stages["detect"], df)
+    texts = []
+    for c, t in col_types.items():
+        if t == "text":
+            timer("text", stages["text"], df[c])
+            texts.extend(df[c].dropna().astype(str).tolist())
+        elif t == "numeric":
+            timer("numeric", stages["numeric"], df[c])
+    timer("sentiment", stages["sentiment"], texts)
+    gps = gps_columns(col_types)
+    if gps:
+        timer("gps", stages["gps"], df, *gps)
+    del df, texts
+
+    report = timer("analyze", stages["analyze"], path, compact=True)
+    timer("analyze_chunked", stages["analyze"], path, chunksize=50000, compact=True)
+    timer("summarize", stages["summarize"], report)
+    return timer.stages, peak_rss_mb()
+
+
+def bench_api(path):
+    """Time POST /api/analyze end to end; returns (seconds, worker peak RSS MB)"""
+    from fastapi.testclient import TestClient
+    import main
+    from jobs import job_manager
+
+    with TestClient(main.app) as client:
+        client.post("/api/auth/register", json={"email": "bench@example.com", "username": "bench", "password": "bench"})
+        token = client.post("/api/auth/login", data={"username": "bench@example.com", "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        start = time.perf_counter()
+        with open(path, "rb") as f:
+            response = client.post("/api/analyze", files={"file": (os.path.basename(path), f)}, headers=headers)
+        seconds = round(time.perf_counter() - start, 4)
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/analyze returned {response.status_code}: {response.text[:200]}")
+        pids = list(getattr(job_manager._executor, "_processes", {}) or {})
+        worker_rss = max((peak_rss_mb(pid) or 0 for pid in pids), default=None)
+    return seconds, worker_rss
+
+
+def bench_scale(rows, shapes, data_dir, skip_api, queue):
+    """Child process entry point: benchmark every shape at one scale"""
+    workdir = tempfile.mkdtemp(prefix="evlens-bench-")
+    # isolated database, result cache and review stores so every request is a miss
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["RESULT_CACHE_DIR"] = os.path.join(workdir, "results")
+    os.environ["REVIEW_STORE_DIR"] = os.path.join(workdir, "reviews")
+    os.environ.setdefault("ANALYSIS_WORKERS", "1")
+    os.chdir(BACKEND_DIR)
+
+    results = {}
+    for shape in shapes:
+        path = os.path.join(data_dir, f"{shape}_{rows}.csv")
+        if not os.path.exists(path):
+            start = time.perf_counter()
+            write_dataset(shape, rows, path)
+            print(f"  generated {path} in {time.perf_counter() - start:.1f}s", flush=True)
+        stages, rss = bench_stages(path)
+        entry = {"rows": rows, "bytes": os.path.getsize(path), "stages": stages, "peak_rss_mb": rss}
+        if not skip_api:
+            entry["stages"]["api_analyze"], entry["worker_peak_rss_mb"] = bench_api(path)
+        print(f"  {shape} {rows}: " + ", ".join(f"{k}={v}s" for k, v in entry["stages"].items()), flush=True)
+        results[shape] = entry
+    queue.put(results)
+
+
+def run(args):
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="evlens-bench-data-")
+    os.makedirs(data_dir, exist_ok=True)
+    shapes = args.shapes.split(",")
+    out = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": {},
+    }
+    # fork where available so the app's process pool uses the platform default
+    # start method inside the child, as it does in production
+    method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    ctx = multiprocessing.get_context(method)
+    for label in args.scales.split(","):
+        rows = parse_rows(label)
+        print(f"scale {label} ({rows} rows)", flush=True)
+        queue = ctx.Queue()
+        proc = ctx.Process(target=bench_scale, args=(rows, shapes, data_dir, args.skip_api, queue))
+        proc.start()
+        results = queue.get()
+        proc.join()
+        for shape, entry in results.items():
+            out["results"][f"{shape}/{label}"] = entry
+    with open(args.out, "w") as f:
+        json.dump(out, f, indent=2)
+    print(f"wrote {args.out}")
+
+
+def compare(args):
+    """Print per-stage ratios and exit 1 if any stage or peak RSS regressed past the threshold"""
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    with open(args.current) as f:
+        current = json.load(f)["results"]
+
+    regressions = []
+    for key in sorted(set(baseline) & set(current)):
+        base, cur = baseline[key], current[key]
+        print(key)
+        metrics = [(f"{stage} (s)", base["stages"][stage], cur["stages"][stage])
+                   for stage in base["stages"] if stage in cur["stages"]]
+        for rss in ("peak_rss_mb", "worker_peak_rss_mb"):
+            if base.get(rss) and cur.get(rss):
+                metrics.append((rss, base[rss], cur[rss]))
+        for name, old, new in metrics:
+            ratio = new / old if old else float("inf")
+            regressed = ratio > 1 + args.threshold and (not name.endswith("(s)") or new >= MIN_COMPARE_SECONDS)
+            flag = "  REGRESSION" if regressed else ""
+            print(f"  {name:28s} {old:>10.4g} -> {new:<10.4g} x{ratio:.2f}{flag}")
+            if regressed:
+                regressions.append(f"{key} {name}")
+    for key in sorted(set(baseline) ^ set(current)):
+        print(f"{key}: only in {'baseline' if key in baseline else 'current'}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}:")
+        for r in regressions:
+            print(f"  {r}")
+        sys.exit(1)
+    print("no regressions")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Benchmark the analysis pipeline.")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    r = sub.add_parser("run", help="Run the benchmark and write a JSON baseline.")
+    r.add_argument("--scales", default="1k,100k", help="Comma-separated row counts, e.g. 1k,100k,1m")
+    r.add_argument("--shapes", default=",".join(SHAPES), help=f"Comma-separated subset of {SHAPES}")
+    r.add_argument("--data-dir", default=None, help="Where generated CSVs are kept and reused between runs.")
+    r.add_argument("--skip-api", action="store_true", help="Skip the end-to-end /api/analyze request.")
+    r.add_argument("--out", default="benchmark.json")
+    r.set_defaults(func=run)
+
+    c = sub.add_parser("compare", help="Diff a run against a baseline.")
+    c.add_argument("baseline")
+    c.add_argument("current")
+    c.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown/growth ratio (0.15 = 15%%).")
+    c.set_defaults(func=compare)
+
+    args = p.parse_args()
+    args.func(args)
@@ -0,0 +1,80 @@
+"""
+Parity check and benchmark for the batched sentiment scorer against TextBlob.
+
+Usage:
+    python benchmarks/sentiment.py                    # parity on the sample CSVs
+    python benchmarks/sentiment.py --reviews 200000   # throughput on synthetic reviews
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from textblob import TextBlob
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "ml_src"))
+
+from analyzer import detect_columns  # noqa: E402
+from sentiment import get_scorer, sentiment_buckets  # noqa: E402
+
+SAMPLE_FILES = [
+    os.path.join(BACKEND_DIR, "..", "sample_event_reviews.csv"),
+    os.path.join(BACKEND_DIR, "..", "sample_event_reviews_mixed_sentiment.csv"),
+    os.path.join(BACKEND_DIR, "..", "sample_event_reviews_small.csv"),
+    os.path.join(BACKEND_DIR, "sample_data", "demo_instagram_data.csv"),
+    os.path.join(BACKEND_DIR, "sample_data", "techvistara_demo.csv"),
+]
+
+
+def textblob_polarity(texts):
+    return np.array([TextBlob(t).sentiment.polarity for t in texts])
+
+
+def check_parity(path):
+    """Compare buckets and per-review polarity for every text column of a CSV"""
+    df = pd.read_csv(path)
+    ok = True
+    for col, kind in detect_columns(df).items():
+        if kind != 'text':
+            continue
+        texts = df[col].dropna().astype(str).tolist()
+        if not texts:
+            continue
+        batch, _ = get_scorer().score(texts)
+        reference = textblob_polarity(texts)
+        same = sentiment_buckets(batch) == sentiment_buckets(reference)
+        ok &= same
+        print(f"{os.path.basename(path)}:{col} n={len(texts)} "
+              f"buckets={'match' if same else 'DIFFER'} max|dp|={np.abs(batch - reference).max():.4f}")
+    return ok
+
+
+def synthetic_reviews(n, seed=42):
+    rng = np.random.default_rng(seed)
+    pool = pd.read_csv(SAMPLE_FILES[1])['review_text'].tolist() + pd.read_csv(SAMPLE_FILES[0])['review_text'].tolist()
+    return [pool[i] for i in rng.integers(0, len(pool), n)]
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser(description='Batched sentiment parity/benchmark.')
+    p.add_argument('--reviews', type=int, default=0, help='Also time scoring this many synthetic reviews.')
+    args = p.parse_args()
+
+    all_ok = all([check_parity(path) for path in SAMPLE_FILES])
+
+    if args.reviews:
+        texts = synthetic_reviews(args.reviews)
+        get_scorer()
+        start = time.perf_counter()
+        get_scorer().score(texts)
+        batch_time = time.perf_counter() - start
+        n_ref = min(len(texts), 5000)
+        start = time.perf_counter()
+        textblob_polarity(texts[:n_ref])
+        ref_time = (time.perf_counter() - start) * len(texts) / n_ref
+        print(f"{len(texts)} reviews: batched {batch_time:.2f}s, TextBlob ~{ref_time:.2f}s (extrapolated from {n_ref})")
+
+    sys.exit(0 if all_ok else 1)
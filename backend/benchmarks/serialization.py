@@ -0,0 +1,148 @@
+"""
+Benchmark for report serialization: the response_model path against the
+orjson path in responses.py, plus gzip/brotli compression.
+
+A synthetic report of roughly --mb megabytes (review samples, numeric stats
+with numpy floats, per-group blocks and trend arrays) is encoded by each
+encoder on its own, then served by a small FastAPI app both ways and fetched
+with and without compression.
+
+Usage:
+    python benchmarks/serialization.py --mb 50
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import orjson
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from responses import BROTLI_AVAILABLE, GZIP_LEVEL, BROTLI_QUALITY, dumps, json_response  # noqa: E402
+from schemas import AnalysisResponse  # noqa: E402
+
+WORDS = ("great event loved the speakers venue food queue long stage sound crowded amazing workshop "
+         "networking wifi slow registration smooth coffee panel keynote parking volunteers helpful").split()
+
+
+def make_report(target_mb, seed=42):
+    """An AnalysisResponse body of about target_mb MB, shaped like a real report"""
+    rng = random.Random(seed)
+    nrng = np.random.default_rng(seed)
+
+    def review():
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 60)))
+
+    def numeric():
+        values = nrng.normal(40, 6, 100)
+        # numpy scalars, as analyze_numeric_column computes them
+        return {"count": 100, "mean": np.float64(values.mean()), "std": np.float64(values.std()),
+                "min": np.float64(values.min()), "max": np.float64(values.max()), "top_5_values": ["40", "41"]}
+
+    def text(n):
+        return {"n_reviews": n, "avg_length_words": 34.0, "sample_reviews": [review() for _ in range(n)],
+                "keywords": WORDS[:8], "representative_reviews": [review() for _ in range(5)],
+                "sentiment": {"positive": 10, "negative": 2, "neutral": 3, "average_polarity": 0.2}}
+
+    report = {"n_rows": 0, "n_cols": 6, "columns": {"review": "text", "likes": "numeric"}, "analysis": {},
+              "groups": {"by": ["eventName"], "groups": []},
+              "trends": {"postDate": {"hourly": {"count": nrng.integers(0, 50, 2000).tolist(),
+                                                 "engagement": {"likes": nrng.random(2000).tolist()}}}}}
+    body = {"report": report, "summary": {"summary": review(), "key_themes": WORDS[:5]},
+            "message": "Analysis completed successfully", "analysis_id": "0" * 64 + "-v9"}
+    size, i = 0, 0
+    while size < target_mb * 1024 * 1024:
+        block = text(2000)
+        report["analysis"][f"review_{i}"] = block
+        report["analysis"][f"likes_{i}"] = numeric()
+        report["groups"]["groups"].append({"key": {"eventName": f"event {i}"}, "analysis": {"likes": numeric()}})
+        size += sum(len(r) + 3 for r in block["sample_reviews"])
+        i += 1
+    report["n_rows"] = i * 2000
+    return body
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def bench_encoders(body, repeat):
+    plain = json.loads(dumps(body))  # numpy-free copy for the stdlib encoder
+    rows = []
+    seconds, data = best_of(lambda: json.dumps(plain, ensure_ascii=False, separators=(",", ":")).encode(), repeat)
+    rows.append(("json.dumps (plain floats)", seconds, len(data)))
+    seconds, data = best_of(lambda: AnalysisResponse(**body).model_dump(mode="json"), repeat)
+    rows.append(("pydantic validate + dump", seconds, None))
+    seconds, data = best_of(lambda: dumps(body), repeat)
+    rows.append(("orjson (numpy native)", seconds, len(data)))
+    seconds, gz = best_of(lambda: gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0), repeat)
+    rows.append((f"gzip level {GZIP_LEVEL}", seconds, len(gz)))
+    if BROTLI_AVAILABLE:
+        import brotli
+        seconds, br = best_of(lambda: brotli.compress(data, quality=BROTLI_QUALITY), repeat)
+        rows.append((f"brotli quality {BROTLI_QUALITY}", seconds, len(br)))
+    return rows
+
+
+def bench_endpoints(body, repeat):
+    """Serve body through response_model and through json_response; time the requests"""
+    from fastapi import FastAPI, Request
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+
+    @app.get("/model", response_model=AnalysisResponse)
+    async def model():
+        # numpy float64 is a float subclass, so the stdlib encoder takes this body as is
+        return AnalysisResponse(**body)
+
+    @app.get("/orjson", response_model=AnalysisResponse)
+    async def fast(request: Request):
+        return await json_response(request, body)
+
+    encodings = ["identity", "gzip"] + (["br"] if BROTLI_AVAILABLE else [])
+    rows = []
+    with TestClient(app) as client:
+        for path, accept in [("/model", "identity")] + [("/orjson", e) for e in encodings]:
+            def fetch():
+                response = client.get(path, headers={"Accept-Encoding": accept})
+                response.raise_for_status()
+                return response
+            seconds, response = best_of(fetch, repeat)
+            wire = response.headers.get("content-length") or len(response.content)
+            rows.append((f"GET {path} ({accept})", seconds, int(wire)))
+    return rows
+
+
+def print_rows(title, rows):
+    print(title)
+    for name, seconds, size in rows:
+        size = f"{size / 1024 / 1024:8.1f} MB" if size else " " * 11
+        print(f"  {name:<32} {seconds:8.3f}s {size}")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Benchmark report serialization.")
+    p.add_argument("--mb", type=float, default=50, help="Approximate report size in MB.")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--skip-endpoints", action="store_true", help="Only time the encoders.")
+    args = p.parse_args()
+
+    start = time.perf_counter()
+    body = make_report(args.mb)
+    print(f"report: {len(orjson.dumps(body, option=orjson.OPT_SERIALIZE_NUMPY)) / 1024 / 1024:.1f} MB "
+          f"(built in {time.perf_counter() - start:.1f}s)")
+    print_rows("encoders (best of %d):" % args.repeat, bench_encoders(body, args.repeat))
+    if not args.skip_endpoints:
+        print_rows("endpoints (best of %d, wire size):" % args.repeat, bench_endpoints(body, args.repeat))
@@ -0,0 +1,127 @@
+"""
+Synthetic CSV generators shaped like our sample files, for benchmarks.
+
+    reviews    -> sample_event_reviews.csv   (event_name, review_text)
+    instagram  -> demo_instagram_data.csv    (eventName ... aspects, 21 columns)
+
+Review text is stitched together from the sentences of the real sample files,
+so TF-IDF vocabularies and sentiment distributions look like production data.
+
+Usage:
+    python benchmarks/synthetic.py --shape instagram --rows 100k --out /tmp/insta_100k.csv
+"""
+import argparse
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REVIEW_FILES = [
+    os.path.join(BACKEND_DIR, "..", "sample_event_reviews.csv"),
+    os.path.join(BACKEND_DIR, "..", "sample_event_reviews_mixed_sentiment.csv"),
+]
+INSTAGRAM_FILE = os.path.join(BACKEND_DIR, "sample_data", "demo_instagram_data.csv")
+
+SHAPES = ("reviews", "instagram")
+
+
+def parse_rows(value: str) -> int:
+    """'1k' -> 1000, '1m' -> 1000000, '250' -> 250"""
+    value = value.strip().lower()
+    scale = {"k": 1000, "m": 1000000}.get(value[-1:], 1)
+    return int(float(value.rstrip("km")) * scale)
+
+
+def _sentences(texts):
+    pool = []
+    for text in texts:
+        pool.extend(s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if len(s.split()) > 2)
+    return np.array(sorted(set(pool)), dtype=object)
+
+
+def _texts(rng, pool, n, low=1, high=4):
+    """n texts of low..high sentences drawn from pool"""
+    counts = rng.integers(low, high + 1, size=n)
+    picks = pool[rng.integers(0, len(pool), size=int(counts.sum()))]
+    ends = np.cumsum(counts)
+    return [" ".join(picks[e - c:e]) for c, e in zip(counts, ends)]
+
+
+def event_reviews(n: int, seed: int = 42) -> pd.DataFrame:
+    """Rows shaped like sample_event_reviews.csv"""
+    rng = np.random.default_rng(seed)
+    source = pd.concat([pd.read_csv(path) for path in REVIEW_FILES], ignore_index=True)
+    events = source["event_name"].dropna().unique()
+    return pd.DataFrame({
+        "event_name": events[rng.integers(0, len(events), size=n)],
+        "review_text": _texts(rng, _sentences(source["review_text"].dropna()), n),
+    })
+
+
+def instagram_posts(n: int, seed: int = 42) -> pd.DataFrame:
+    """Rows shaped like demo_instagram_data.csv (posts plus comment rows)"""
+    rng = np.random.default_rng(seed)
+    source = pd.read_csv(INSTAGRAM_FILE)
+    sentences = _sentences(pd.concat([
+        source["postContent"].dropna(),
+        *(pd.read_csv(path)["review_text"].dropna() for path in REVIEW_FILES),
+    ]))
+
+    def pick(column, size=n):
+        values = source[column].dropna().unique()
+        return values[rng.integers(0, len(values), size=size)] if len(values) else np.full(size, "")
+
+    likes = rng.poisson(40, size=n)
+    comments = rng.poisson(2, size=n)
+    shares = rng.poisson(1, size=n)
+    is_comment = rng.random(n) < 0.3
+    start = pd.Timestamp("2025-11-01")
+    post_dates = start + pd.to_timedelta(rng.integers(0, 30 * 24 * 3600, size=n), unit="s")
+    comment_text = np.where(is_comment, np.array(_texts(rng, sentences, n, 1, 2), dtype=object), "")
+    return pd.DataFrame({
+        "eventName": pick("eventName"),
+        "eventDate": pick("eventDate"),
+        "platform": pick("platform"),
+        "postType": np.where(is_comment, "comment", "post"),
+        "postContent": _texts(rng, sentences, n, 2, 5),
+        "postUrl": [f"https://www.instagram.com/p/{i:011x}/" for i in range(n)],
+        "postAuthor": pick("postAuthor"),
+        "postLikes": likes,
+        "postComments": comments,
+        "postShares": shares,
+        "postSentiment": rng.choice(["positive", "neutral", "negative"], size=n, p=[0.5, 0.4, 0.1]),
+        "postDate": post_dates.strftime("%Y-%m-%dT%H:%M:%S"),
+        "postEngagement": likes + comments + shares,
+        "relevanceScore": rng.integers(0, 100, size=n),
+        "commentAuthor": np.where(is_comment, pick("postAuthor"), ""),
+        "commentText": comment_text,
+        "commentLikes": np.where(is_comment, rng.poisson(3, size=n), 0),
+        "commentDate": np.where(is_comment, post_dates.strftime("%Y-%m-%dT%H:%M:%S"), ""),
+        "issues": "",
+        "praise": "",
+        "aspects": "",
+    })
+
+
+GENERATORS = {"reviews": event_reviews, "instagram": instagram_posts}
+
+
+def write_dataset(shape: str, rows: int, path: str, seed: int = 42) -> str:
+    """Generate shape at rows rows into path (in 100k-row blocks) and return path"""
+    block = 100000
+    for i, start in enumerate(range(0, rows, block)):
+        df = GENERATORS[shape](min(block, rows - start), seed=seed + i)
+        df.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Write a synthetic benchmark CSV.")
+    p.add_argument("--shape", choices=SHAPES, default="reviews")
+    p.add_argument("--rows", default="1k", help="Row count, e.g. 1k, 100k, 1m")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--out", required=True)
+    args = p.parse_args()
+    print(write_dataset(args.shape, parse_rows(args.rows), args.out, args.seed))
@@ -0,0 +1,223 @@
+"""
+Background analysis jobs backed by an app-lifetime process pool
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Dict, Any, List, Optional
+
+try:
+    from ml_service import get_pipeline, run_analysis, warm_worker
+except ImportError:
+    from backend.ml_service import get_pipeline, run_analysis, warm_worker
+
+logger = logging.getLogger(__name__)
+
+# Number of worker processes. Each worker holds its own copy of pandas/sklearn
+# plus the data of the analysis it runs, so the default of 1 suits the 512MB
+# free tier; raise it on instances with more memory.
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "1"))
+
+# How long finished jobs (and their results) are kept for polling
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+# Flag files that stop running analyses (see ml_src/cancellation.py)
+ANALYSIS_CANCEL_DIR = os.getenv("ANALYSIS_CANCEL_DIR", os.path.join(tempfile.gettempdir(), "evlens-cancel"))
+
+
+class AnalysisTask:
+    """An analysis in the pool that can be cancelled while queued or running"""
+
+    def __init__(self, future: Future, cancel_path: str):
+        self.future = future
+        self.cancel_path = cancel_path
+        self.started_path = get_pipeline()["started_path"](cancel_path)
+        future.add_done_callback(lambda f: self._clear())
+
+    def wait(self) -> "asyncio.Future":
+        """Awaitable for the result"""
+        return asyncio.wrap_future(self.future)
+
+    def started(self) -> bool:
+        """
+        True once a worker has begun the analysis (or it is over). Unlike
+        future.running(), False while it still waits in the pool's call queue.
+        """
+        return self.future.done() or os.path.exists(self.started_path)
+
+    def cancel(self):
+        """
+        Drop the analysis if it has not started yet, otherwise ask its worker
+        to stop at the next checkpoint; the future then fails with
+        AnalysisCancelled and the worker takes the next job.
+        """
+        if self.future.done() or self.future.cancel():
+            return
+        with open(self.cancel_path, "w"):
+            pass
+        if self.future.done():
+            self._clear()
+
+    def _clear(self):
+        for path in (self.cancel_path, self.started_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def is_cancelled(future: Future) -> bool:
+    """True if the analysis was dropped from the queue or stopped at a checkpoint"""
+    return future.cancelled() or isinstance(future.exception(), get_pipeline()["cancelled_error"])
+
+
+def analysis_status(future: Future) -> str:
+    """'completed', 'failed' or 'cancelled' for a finished analysis, as job records report it"""
+    if is_cancelled(future):
+        return "cancelled"
+    return "failed" if future.exception() is not None else "completed"
+
+
+class JobManager:
+    """Owns the process pool and the in-memory table of submitted jobs"""
+
+    def __init__(self, max_workers: int = ANALYSIS_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Create the worker pool (called once on app startup)"""
+        if self._executor is None:
+            logger.info(f"Starting analysis pool with {self.max_workers} worker(s)")
+            os.makedirs(ANALYSIS_CANCEL_DIR, exist_ok=True)
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=warm_worker)
+
+    def shutdown(self):
+        """Stop the worker pool, cancelling anything still queued"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _submit(self, fn, *args) -> Future:
+        if self._executor is None:
+            self.start()
+        return self._executor.submit(fn, *args)
+
+    def start_analysis(self, file_path: str, review_store_dir: Optional[str] = None,
+                       group_by: Optional[List[str]] = None, on_done=None,
+                       events_path: Optional[str] = None) -> AnalysisTask:
+        """
+        Queue run_analysis for file_path. on_done() is called once the work has
+        really ended (finished, failed or cancelled), even if whoever awaits
+        it gave up first. The worker appends progress events to events_path.
+        """
+        cancel_path = os.path.join(ANALYSIS_CANCEL_DIR, uuid.uuid4().hex)
+        future = self._submit(run_analysis, file_path, review_store_dir, group_by, cancel_path, events_path)
+        if on_done is not None:
+            future.add_done_callback(lambda f: on_done())
+        return AnalysisTask(future, cancel_path)
+
+    def _new_job(self, owner_id: int, analysis_id: Optional[str] = None) -> Dict[str, Any]:
+        self._prune()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "owner_id": owner_id,
+            "analysis_id": analysis_id,
+            "status": "queued",
+            "created_at": time.time(),
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            "_task": None,
+        }
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+        return job
+
+    def submit(self, file_path: str, owner_id: int, on_result=None,
+               analysis_id: Optional[str] = None, review_store_dir: Optional[str] = None,
+               group_by: Optional[List[str]] = None, on_done=None,
+               events_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Queue a full analysis of file_path and return the job record.
+        on_result(result) is called once the job completes successfully,
+        on_done() once it has ended either way.
+        """
+        job = self._new_job(owner_id, analysis_id)
+        job_id = job["job_id"]
+        task = self.start_analysis(file_path, review_store_dir, group_by, events_path=events_path)
+        job["_task"] = task
+        task.future.add_done_callback(lambda f: self._finish(job_id, file_path, f, on_result, on_done))
+        return job
+
+    def add_completed(self, owner_id: int, result: Dict[str, Any], analysis_id: Optional[str] = None) -> Dict[str, Any]:
+        """Record a job whose result is already known (e.g. a cache hit)"""
+        job = self._new_job(owner_id, analysis_id)
+        job["status"] = "completed"
+        job["finished_at"] = job["created_at"]
+        job["result"] = result
+        return job
+
+    def _finish(self, job_id: str, file_path: str, future: Future, on_result=None, on_done=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        if on_done is not None:
+            on_done()
+        if job is None:
+            return
+        job["finished_at"] = time.time()
+        job["status"] = analysis_status(future)
+        if job["status"] == "cancelled":
+            return
+        if job["status"] == "failed":
+            logger.error(f"Job {job_id} failed: {future.exception()}")
+            job["error"] = str(future.exception())
+        else:
+            job["result"] = future.result()
+            if on_result is not None:
+                try:
+                    on_result(job["result"])
+                except Exception as e:
+                    logger.error(f"Job {job_id} result callback failed: {e}")
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job record, refreshing queued/running status"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None and job["status"] == "queued" and job["_task"] is not None and job["_task"].started():
+            job["status"] = "running"
+        return job
+
+    def cancel(self, job_id: str):
+        """Stop a queued or running job; it ends up 'cancelled' (or as it was, if it already finished)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None and job["_task"] is not None:
+            job["_task"].cancel()
+
+    def queue_depth(self) -> int:
+        """Number of jobs that are queued or running"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job["finished_at"] is None)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job["finished_at"] is not None and job["finished_at"] < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+job_manager = JobManager()
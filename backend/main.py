@@ -1,23 +1,38 @@
 """
 FastAPI Backend for Event Review Summarizer
 """
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, status
+from fastapi import FastAPI, Depends, Header, HTTPException, UploadFile, File, Request, Query, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Optional, List
 import uvicorn
 import os
-import shutil
+import asyncio
+import hashlib
+import json
+import tempfile
+import time
+import zipfile
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 
 from database import SessionLocal, engine, Base
 from models import User
-from schemas import UserCreate, UserResponse, Token, AnalysisResponse
-from auth import get_current_user, get_password_hash, verify_password, create_access_token
-from ml_service import analyze_csv_file, generate_summary_improved
+from schemas import UserCreate, UserResponse, Token, AnalysisResponse, JobResponse, JobStatusResponse, ReviewPage
+from auth import get_current_user, get_stream_user, get_password_hash, verify_password, create_access_token
+from ml_service import (
+    combine_reports, get_pipeline, startup_report, PIPELINE_VERSION, PYARROW_AVAILABLE, COLUMNAR_EXTENSIONS,
+    ZSTD_AVAILABLE, COMPRESSED_EXTENSIONS
+)
+from jobs import job_manager, analysis_status
+from admission import admission, AdmissionRejected, estimate_cost_mb
+from result_cache import result_cache
+from review_stores import review_stores
+from progress_logs import progress_logs, sse_event, DONE_EVENT
+from responses import dumps, json_response
+import metrics
 import logging
 
 logger = logging.getLogger(__name__)
@@ -63,6 +78,89 @@ app.add_middleware(
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# Uploads are streamed to disk (and hashed) in blocks of this size
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Largest page of reviews returned by /api/analyses/{id}/reviews
+MAX_REVIEW_PAGE = 500
+
+# Per-file limit for an analysis (5 minutes analysis + 2 minutes summary)
+ANALYSIS_TIMEOUT_SECONDS = 420.0
+
+# How often a waiting /api/analyze request checks that its client is still
+# connected, and the status it ends with when not (nginx's "client closed request")
+DISCONNECT_POLL_SECONDS = 1.0
+CLIENT_CLOSED_REQUEST = 499
+
+# /api/analyze/batch: most files per request (after unpacking zips) and most
+# bytes they may add up to once decompressed
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "50"))
+MAX_BATCH_MB = float(os.getenv("MAX_BATCH_MB", "2048"))
+
+# Most columns a group_by parameter may name
+MAX_GROUP_BY_COLUMNS = 4
+
+# What a 429 from admission control tells the client, by rejection reason
+ADMISSION_DETAILS = {
+    "inflight": "too many analyses are in progress",
+    "megabytes": "too much data is being analyzed",
+    "user_share": "you already have analyses in progress",
+}
+
+metrics.register_gauge(
+    "evlens_analysis_jobs_in_flight", "Analyses currently queued or running.", job_manager.queue_depth
+)
+metrics.register_gauge(
+    "evlens_admission_inflight_analyses", "Analyses admitted and not finished.", lambda: admission.inflight
+)
+metrics.register_gauge(
+    "evlens_admission_inflight_megabytes", "Estimated MB of work admitted and not finished.",
+    lambda: round(admission.inflight_mb, 1)
+)
+metrics.register_counter(
+    "evlens_admission_rejections_total", "Analysis requests rejected with 429.", lambda: admission.rejected
+)
+
+
+class RequestLatencyMiddleware:
+    """
+    Records request latency until the response is sent. Plain ASGI: an
+    @app.middleware("http") function wraps receive() so that endpoints never
+    see the client disconnect, which wait_for_analysis relies on.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # label by route template (/api/jobs/{job_id}), not the raw path
+            route = scope.get("route")
+            metrics.request_latency.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code),
+            )
+
+
+app.add_middleware(RequestLatencyMiddleware)
+
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -72,6 +170,20 @@ def get_db():
         db.close()
 
 
+@app.on_event("startup")
+async def start_job_pool():
+    """Resolve the analysis pipeline, then create the shared process pool"""
+    # Loaded before the pool so forked workers inherit the imported modules
+    app.state.startup_report = startup_report()
+    logger.info(f"Analysis pipeline ready: {app.state.startup_report}")
+    job_manager.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_pool():
+    job_manager.shutdown()
+
+
 @app.get("/")
 async def root():
     return {"message": "Event Review Summarizer API", "status": "running"}
@@ -139,47 +251,230 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
     )
 
 
+def upload_extension(filename: Optional[str]) -> str:
+    """
+    Extension of an uploaded file name, if it is a format the analyzer reads.
+    Compressed CSVs keep both parts (".csv.gz") so the codec can be inferred.
+    """
+    base, extension = os.path.splitext((filename or "").lower())
+    if extension in COMPRESSED_EXTENSIONS and os.path.splitext(base)[1] == '.csv':
+        if extension == '.zst' and not ZSTD_AVAILABLE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="zstd uploads are not enabled on this server (zstandard is not installed)"
+            )
+        return '.csv' + extension
+    if extension != '.csv' and extension not in COLUMNAR_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be a CSV (optionally .gz, .bz2 or .zst compressed), Parquet, Feather or Arrow file"
+        )
+    if extension in COLUMNAR_EXTENSIONS and not PYARROW_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parquet, Feather and Arrow uploads are not enabled on this server (pyarrow is not installed)"
+        )
+    return extension
+
+
+def write_upload(source, user_id: int, extension: str, max_bytes: Optional[int] = None):
+    """
+    Stream a file object to the uploads directory, hashing it on the way.
+    Returns (path, cache_key): the content hash plus the pipeline version.
+    Raises 413 once more than max_bytes have been read.
+    """
+    # Create uploads directory if it doesn't exist
+    upload_dir = "uploads"
+    os.makedirs(upload_dir, exist_ok=True)
+    
+    fd, file_path = tempfile.mkstemp(dir=upload_dir, prefix=f"{user_id}_", suffix=extension)
+    digest = hashlib.sha256()
+    size = 0
+    with os.fdopen(fd, "wb") as buffer:
+        while True:
+            chunk = source.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                buffer.close()
+                os.remove(file_path)
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Batch is larger than {MAX_BATCH_MB:g}MB uncompressed"
+                )
+            digest.update(chunk)
+            buffer.write(chunk)
+    return file_path, f"{digest.hexdigest()}-v{PIPELINE_VERSION}"
+
+
+def save_upload(file: UploadFile, user_id: int):
+    """
+    Validate and save an uploaded CSV, Parquet, Feather or Arrow IPC file.
+    Compressed CSVs are saved as uploaded and decompressed while parsing.
+    Returns (path, cache_key) where cache_key is the content hash of the
+    upload, computed while it streams to disk, plus the pipeline version.
+    """
+    return write_upload(file.file, user_id, upload_extension(file.filename))
+
+
+def parse_group_by(group_by: Optional[str]) -> List[str]:
+    """Column names of a comma-separated group_by query parameter"""
+    columns = [c.strip() for c in (group_by or "").split(",") if c.strip()]
+    if len(columns) > MAX_GROUP_BY_COLUMNS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"group_by can name at most {MAX_GROUP_BY_COLUMNS} columns"
+        )
+    return columns
+
+
+def group_cache_key(cache_key: str, group_by: List[str]) -> str:
+    """Cache key of a grouped analysis: grouped reports are cached apart from the plain one"""
+    if not group_by:
+        return cache_key
+    return f"{cache_key}_g{hashlib.sha256(json.dumps(group_by).encode()).hexdigest()[:16]}"
+
+
+def admit_analysis(user_id: int, cost_mb: float, paths: List[str], slots: int = 1):
+    """
+    Admission ticket for work headed to the process pool. When the server is
+    saturated the saved uploads in paths are removed and 429 is raised with
+    a Retry-After header.
+    """
+    try:
+        return admission.admit(user_id, cost_mb, slots)
+    except AdmissionRejected as e:
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+        logger.info(f"Rejected {cost_mb:.1f}MB analysis for user {user_id}: {e.reason}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Server is busy: {ADMISSION_DETAILS[e.reason]}. Please retry in {e.retry_after} seconds.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+def store_result(cache_key: str, user_id: int, result, cost_mb: float = None):
+    """Record metrics for a fresh result and cache it (unless the analysis failed)"""
+    metrics.observe_report(result["report"])
+    if cost_mb is not None:
+        admission.observe(result["report"].get("_timings", {}).get("total_seconds"), cost_mb)
+    if "error" not in result["report"]:
+        result_cache.put(cache_key, result)
+        review_stores.grant(cache_key, user_id)
+
+
+def cached_result(cache_key: str, user_id: int):
+    """Cached result for an upload, if both the report and its review store are still there"""
+    if not review_stores.exists(cache_key):
+        return None
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        review_stores.grant(cache_key, user_id)
+    return cached
+
+
+def close_progress(cache_key: str, future):
+    """Done callback of a pool analysis: append the 'done' event to its progress log"""
+    outcome = analysis_status(future)
+    error = None
+    if outcome == "failed":
+        error = str(future.exception())
+    elif outcome == "completed":
+        error = future.result()["report"].get("error")
+    progress_logs.finish(cache_key, outcome, error)
+
+
+def start_analysis(file_path: str, cache_key: str, user_id: int, group_by: List[str] = None, on_done=None):
+    """
+    job_manager.start_analysis with a progress log, so the user can follow
+    it on /api/analyses/{cache_key}/events
+    """
+    events_path = progress_logs.open(cache_key, user_id)
+    try:
+        task = job_manager.start_analysis(file_path, review_stores.path(cache_key), group_by, on_done=on_done,
+                                          events_path=events_path)
+    except Exception as e:
+        progress_logs.finish(cache_key, "failed", str(e))
+        raise
+    task.future.add_done_callback(lambda f: close_progress(cache_key, f))
+    return task
+
+
+async def wait_for_analysis(request: Optional[Request], task, timeout: float = ANALYSIS_TIMEOUT_SECONDS):
+    """
+    Result of a pool analysis started for request. The analysis is cancelled,
+    freeing its worker at the next checkpoint, when it runs past timeout
+    (asyncio.TimeoutError) or the client disconnects (HTTPException 499;
+    not checked without a request). The timeout counts from when a worker
+    picks the analysis up, so time spent queued behind others is not held
+    against it.
+    """
+    future = task.wait()
+    deadline = None
+    try:
+        while True:
+            if deadline is None and task.started():
+                deadline = time.monotonic() + timeout
+            remaining = DISCONNECT_POLL_SECONDS if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            done, _ = await asyncio.wait({future}, timeout=min(DISCONNECT_POLL_SECONDS, remaining))
+            if done:
+                return future.result()
+            if request is not None and await request.is_disconnected():
+                raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed the request")
+    except BaseException:
+        # no-op if the analysis already finished
+        task.cancel()
+        future.cancel()
+        raise
+
+
+def analysis_response(request: Request, result, cache_key: str, cache: str):
+    """An AnalysisResponse, serialized with orjson (see responses.py)"""
+    return json_response(request, {
+        "report": result["report"],
+        "summary": result["summary"],
+        "message": "Analysis completed successfully",
+        "analysis_id": cache_key,
+    }, headers={"X-Cache": cache})
+
+
 @app.post("/api/analyze", response_model=AnalysisResponse)
 async def analyze_csv(
+    request: Request,
     file: UploadFile = File(...),
+    group_by: Optional[str] = Query(None, description="Comma-separated columns to also analyze per group"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Upload CSV file and generate event summary"""
-    import asyncio
-    from concurrent.futures import ThreadPoolExecutor
-    
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File must be a CSV file"
-        )
-    
-    # Create uploads directory if it doesn't exist
-    upload_dir = "uploads"
-    os.makedirs(upload_dir, exist_ok=True)
+    columns = parse_group_by(group_by)
+    file_path, cache_key = save_upload(file, current_user.id)
+    cache_key = group_cache_key(cache_key, columns)
     
-    # Save uploaded file
-    file_path = os.path.join(upload_dir, f"{current_user.id}_{datetime.now().timestamp()}.csv")
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Identical uploads are answered from the result cache
+    cached = cached_result(cache_key, current_user.id)
+    if cached is not None:
+        os.remove(file_path)
+        return await analysis_response(request, cached, cache_key, "HIT")
     
+    cost_mb = estimate_cost_mb(file_path)
+    ticket = admit_analysis(current_user.id, cost_mb, [file_path])
     try:
-        # Run analysis in thread pool to avoid blocking
-        # This prevents timeout issues with long-running ML operations
-        loop = asyncio.get_event_loop()
-        executor = ThreadPoolExecutor(max_workers=1)
+        # Run analysis + summary in the shared process pool so the event loop
+        # stays free and concurrent uploads use separate cores. The ticket is
+        # held until the worker is done, even past a timeout.
+        metrics.queue_depth_at_submit.observe(job_manager.queue_depth())
+        task = start_analysis(file_path, cache_key, current_user.id, columns, on_done=ticket.release)
         
-        # Run analysis with timeout (5 minutes)
+        # Run analysis with timeout (5 minutes analysis + 2 minutes summary);
+        # a timeout or disconnect cancels it
         try:
-            report = await asyncio.wait_for(
-                loop.run_in_executor(executor, analyze_csv_file, file_path),
-                timeout=300.0  # 5 minutes timeout
-            )
-            summary = await asyncio.wait_for(
-                loop.run_in_executor(executor, generate_summary_improved, report),
-                timeout=120.0  # 2 minutes timeout for summary
-            )
+            result = await wait_for_analysis(request, task)
         except asyncio.TimeoutError:
             # Clean up file on timeout
             if os.path.exists(file_path):
@@ -188,25 +483,24 @@ async def analyze_csv(
                 status_code=status.HTTP_504_GATEWAY_TIMEOUT,
                 detail="Analysis took too long. Please try with a smaller CSV file or try again later."
             )
-        finally:
-            executor.shutdown(wait=False)
         
         # Clean up file
         if os.path.exists(file_path):
             os.remove(file_path)
         
-        return AnalysisResponse(
-            report=report,
-            summary=summary,
-            message="Analysis completed successfully"
-        )
+        store_result(cache_key, current_user.id, result, cost_mb)
+        
+        return await analysis_response(request, result, cache_key, "MISS")
     except HTTPException:
-        # Re-raise HTTP exceptions
+        # Re-raise HTTP exceptions (the client went away, or the analysis timed out)
+        if os.path.exists(file_path):
+            os.remove(file_path)
         raise
     except Exception as e:
         # Clean up file on error
         if os.path.exists(file_path):
             os.remove(file_path)
+        ticket.release()
         logger.error(f"Error processing file: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -214,6 +508,317 @@ async def analyze_csv(
         )
 
 
+def expand_batch(files: List[UploadFile], user_id: int):
+    """
+    Save every file of a batch upload, unpacking .zip archives. Returns one
+    entry per file: {"filename", "path", "cache_key"}, or {"filename", "error"}
+    for files the analyzer cannot read. Raises 400/413 (after removing what
+    was saved) when the batch has too many files or bytes.
+    """
+    entries = []
+    budget = int(MAX_BATCH_MB * 1024 * 1024)
+
+    def add(name, source, size_hint=0):
+        nonlocal budget
+        if len(entries) >= MAX_BATCH_FILES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"A batch can hold at most {MAX_BATCH_FILES} files"
+            )
+        try:
+            extension = upload_extension(name)
+        except HTTPException as e:
+            entries.append({"filename": name, "error": e.detail})
+            return
+        if size_hint > budget:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Batch is larger than {MAX_BATCH_MB:g}MB uncompressed"
+            )
+        path, cache_key = write_upload(source, user_id, extension, max_bytes=budget)
+        budget -= os.path.getsize(path)
+        entries.append({"filename": name, "path": path, "cache_key": cache_key})
+
+    try:
+        for file in files:
+            if not (file.filename or "").lower().endswith(".zip"):
+                add(file.filename, file.file)
+                continue
+            try:
+                archive = zipfile.ZipFile(file.file)
+            except zipfile.BadZipFile:
+                entries.append({"filename": file.filename, "error": "Not a valid zip archive"})
+                continue
+            with archive:
+                for info in archive.infolist():
+                    base = os.path.basename(info.filename)
+                    # skip folders and macOS resource forks / hidden files
+                    if info.is_dir() or not base or base.startswith(".") or info.filename.startswith("__MACOSX/"):
+                        continue
+                    with archive.open(info) as member:
+                        add(f"{file.filename}/{info.filename}", member, info.file_size)
+    except BaseException:
+        for entry in entries:
+            if "path" in entry and os.path.exists(entry["path"]):
+                os.remove(entry["path"])
+        raise
+    return entries
+
+
+async def run_batch(entries, user_id: int, group_by: List[str] = None, ticket=None):
+    """
+    Analyze every batch entry in the process pool and yield NDJSON lines as
+    files finish, then one line with the combined report. Identical files
+    are analyzed once. The admission ticket is released once the stream ends.
+    """
+    start = time.perf_counter()
+    shared = {}
+
+    async def analyze(cache_key, file_path, cost_mb):
+        try:
+            cached = cached_result(cache_key, user_id)
+            if cached is not None:
+                return cached, "HIT"
+            metrics.queue_depth_at_submit.observe(job_manager.queue_depth())
+            task = start_analysis(file_path, cache_key, user_id, group_by)
+            # a timeout, or the stream closing, cancels the analysis and frees its worker
+            result = await wait_for_analysis(None, task)
+            store_result(cache_key, user_id, result, cost_mb)
+            return result, "MISS"
+        finally:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    async def analyze_entry(index, entry):
+        line = {"type": "file", "index": index, "filename": entry["filename"]}
+        if "error" in entry:
+            return {**line, "error": entry["error"]}
+        cache_key = entry["cache_key"]
+        if cache_key not in shared:
+            shared[cache_key] = asyncio.ensure_future(analyze(cache_key, entry["path"], entry.get("cost_mb")))
+        elif os.path.exists(entry["path"]):
+            os.remove(entry["path"])
+        try:
+            result, cache = await asyncio.shield(shared[cache_key])
+        except asyncio.TimeoutError:
+            return {**line, "error": "Analysis took too long"}
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                # the stream itself is closing
+                raise
+            return {**line, "status": "cancelled", "error": "Analysis was cancelled"}
+        except get_pipeline()["cancelled_error"]:
+            return {**line, "status": "cancelled", "error": "Analysis was cancelled"}
+        except Exception as e:
+            logger.error(f"Error processing {entry['filename']}: {e}", exc_info=True)
+            return {**line, "error": f"Error processing file: {e}"}
+        if "error" in result["report"]:
+            return {**line, "error": result["report"]["error"]}
+        return {**line, "analysis_id": cache_key, "cache": cache, "report": result["report"], "summary": result["summary"]}
+
+    tasks = [asyncio.ensure_future(analyze_entry(i, entry)) for i, entry in enumerate(entries)]
+    finished = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            if "error" not in line:
+                finished.append(line)
+            yield dumps(line) + b"\n"
+        combined = combine_reports(sorted(finished, key=lambda line: line["index"]))
+        yield dumps({
+            "type": "batch",
+            "files": len(entries),
+            "succeeded": len(finished),
+            "failed": len(entries) - len(finished),
+            "seconds": round(time.perf_counter() - start, 3),
+            "combined": combined,
+        }) + b"\n"
+    finally:
+        # client went away: drop queued analyses and the files waiting for them
+        for task in list(tasks) + list(shared.values()):
+            task.cancel()
+        for entry in entries:
+            if "path" in entry and os.path.exists(entry["path"]):
+                os.remove(entry["path"])
+        if ticket is not None:
+            ticket.release()
+
+
+@app.post("/api/analyze/batch")
+async def analyze_batch(
+    files: List[UploadFile] = File(...),
+    group_by: Optional[str] = Query(None, description="Comma-separated columns to also analyze per group"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Analyze several files (or .zip archives of them) in parallel. Streams
+    NDJSON: one {"type": "file"} line per file as it finishes, with its
+    report and summary or an error, then a {"type": "batch"} line with the
+    combined cross-event report.
+    """
+    columns = parse_group_by(group_by)
+    entries = expand_batch(files, current_user.id)
+    if not any("path" in entry for entry in entries):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No CSV, Parquet, Feather or Arrow files to analyze"
+        )
+    costs = {}
+    for entry in entries:
+        if "cache_key" in entry:
+            entry["cache_key"] = group_cache_key(entry["cache_key"], columns)
+            entry["cost_mb"] = costs.setdefault(entry["cache_key"], estimate_cost_mb(entry["path"]))
+    # the batch is admitted as a whole; its files share the user's slots
+    ticket = admit_analysis(
+        current_user.id, sum(costs.values()), [entry["path"] for entry in entries if "path" in entry],
+        slots=min(len(costs), admission.user_max_inflight)
+    )
+    return StreamingResponse(run_batch(entries, current_user.id, columns, ticket), media_type="application/x-ndjson")
+
+
+@app.post("/api/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    file: UploadFile = File(...),
+    group_by: Optional[str] = Query(None, description="Comma-separated columns to also analyze per group"),
+    current_user: User = Depends(get_current_user)
+):
+    """Upload CSV file and queue it for background analysis"""
+    columns = parse_group_by(group_by)
+    file_path, cache_key = save_upload(file, current_user.id)
+    cache_key = group_cache_key(cache_key, columns)
+    
+    cached = cached_result(cache_key, current_user.id)
+    if cached is not None:
+        os.remove(file_path)
+        job = job_manager.add_completed(current_user.id, cached, analysis_id=cache_key)
+        return JobResponse(job_id=job["job_id"], status=job["status"], analysis_id=cache_key)
+    
+    cost_mb = estimate_cost_mb(file_path)
+    ticket = admit_analysis(current_user.id, cost_mb, [file_path])
+    metrics.queue_depth_at_submit.observe(job_manager.queue_depth())
+    events_path = progress_logs.open(cache_key, current_user.id)
+    try:
+        job = job_manager.submit(
+            file_path, current_user.id,
+            on_result=lambda result: store_result(cache_key, current_user.id, result, cost_mb),
+            analysis_id=cache_key, review_store_dir=review_stores.path(cache_key), group_by=columns,
+            on_done=ticket.release, events_path=events_path
+        )
+    except Exception as e:
+        ticket.release()
+        progress_logs.finish(cache_key, "failed", str(e))
+        raise
+    job["_task"].future.add_done_callback(lambda f: close_progress(cache_key, f))
+    return JobResponse(job_id=job["job_id"], status=job["status"], analysis_id=cache_key)
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str, request: Request, current_user: User = Depends(get_current_user)):
+    """Poll the status of a background analysis job"""
+    job = job_manager.get(job_id)
+    if job is None or job["owner_id"] != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    result = job["result"] or {}
+    return await json_response(request, {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "analysis_id": job["analysis_id"] if job["status"] == "completed" else None,
+        "created_at": datetime.fromtimestamp(job["created_at"]),
+        "finished_at": datetime.fromtimestamp(job["finished_at"]) if job["finished_at"] else None,
+        "report": result.get("report"),
+        "summary": result.get("summary"),
+        "error": job["error"],
+    })
+
+
+@app.delete("/api/jobs/{job_id}", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def cancel_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """Cancel a queued or running job; its worker stops at the next checkpoint"""
+    job = job_manager.get(job_id)
+    if job is None or job["owner_id"] != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    job_manager.cancel(job_id)
+    return JobResponse(job_id=job["job_id"], status=job["status"], analysis_id=job["analysis_id"])
+
+
+@app.get("/api/analyses/{analysis_id}/reviews", response_model=ReviewPage)
+async def get_reviews(
+    analysis_id: str,
+    request: Request,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_REVIEW_PAGE),
+    column: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Page through every review of an analysis (the report only carries a sample)"""
+    page = review_stores.page(analysis_id, current_user.id, column, offset, limit)
+    if page is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reviews not found"
+        )
+    return await json_response(request, {"analysis_id": analysis_id, "offset": offset, "limit": limit, **page})
+
+
+@app.get("/api/analyses/{analysis_id}/events")
+async def analysis_events(
+    analysis_id: str,
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(get_stream_user)
+):
+    """
+    Server-Sent Events for a running analysis: 'start' (estimated rows),
+    'stage' (start/end of each pipeline stage), 'rows' (rows processed),
+    'columns' (detected types), 'keywords' and running 'sentiment' counts per
+    text column, and a final 'done' with status completed, failed or
+    cancelled. Stop a job early with DELETE /api/jobs/{job_id}. EventSource
+    clients pass the token as ?access_token=; reconnecting ones resume after
+    Last-Event-ID.
+    """
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if progress_logs.readable(analysis_id, current_user.id):
+        try:
+            after = int(last_event_id or 0)
+        except ValueError:
+            after = 0
+        return StreamingResponse(progress_logs.follow(analysis_id, request, after),
+                                 media_type="text/event-stream", headers=headers)
+    if review_stores.readable(analysis_id, current_user.id):
+        # finished before the stream was opened (or its log expired): it is in the cache
+        done = json.dumps({"event": DONE_EVENT, "status": "completed", "analysis_id": analysis_id, "cache": "HIT"})
+        return Response(sse_event(1, DONE_EVENT, done), media_type="text/event-stream", headers=headers)
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Analysis not found"
+    )
+
+
+@app.get("/api/cache/stats")
+async def cache_stats(current_user: User = Depends(get_current_user)):
+    """Result cache size, hit/miss and eviction counters"""
+    return result_cache.stats()
+
+
+@app.get("/api/admission/stats")
+async def admission_stats(current_user: User = Depends(get_current_user)):
+    """Analyses and estimated MB in flight against the admission limits"""
+    return admission.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
 
@@ -0,0 +1,120 @@
+"""
+Prometheus metrics for the API, exposed as text at GET /metrics
+"""
+import threading
+from typing import Dict, Any, Iterable, Tuple
+
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+QUEUE_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+ROWS_PER_SECOND_BUCKETS = (100, 1000, 5000, 10000, 25000, 50000, 100000, 250000, 1000000)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    def __init__(self, name: str, documentation: str, buckets: Iterable[float], labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labels = labels
+        self._series: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._series[label_values] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series["counts"]):
+                    le = _format_labels(self.labels, label_values, f'le="{bound:g}"')
+                    lines.append(f"{self.name}_bucket{le} {count}")
+                inf = _format_labels(self.labels, label_values, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf} {series['count']}")
+                plain = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{plain} {series['sum']:.6g}")
+                lines.append(f"{self.name}_count{plain} {series['count']}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time"""
+
+    def __init__(self, name: str, documentation: str, read):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def render(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge", f"{self.name} {self.read()}"]
+
+
+class CallbackCounter(Gauge):
+    """Counter whose running total is read from a callback at scrape time"""
+
+    def render(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter", f"{self.name} {self.read()}"]
+
+
+request_latency = Histogram(
+    "evlens_request_duration_seconds", "HTTP request latency.", LATENCY_BUCKETS, ("method", "route", "status")
+)
+stage_latency = Histogram(
+    "evlens_analysis_stage_duration_seconds", "Wall time of each analysis pipeline stage.", LATENCY_BUCKETS, ("stage",)
+)
+stage_peak_rss = Histogram(
+    "evlens_analysis_stage_peak_rss_megabytes", "Worker peak RSS while each analysis stage ran.",
+    (64, 128, 256, 384, 512, 768, 1024, 2048, 4096), ("stage",)
+)
+queue_depth_at_submit = Histogram(
+    "evlens_analysis_queue_depth", "Analyses queued or running when a new one is submitted.", QUEUE_BUCKETS
+)
+rows_per_second = Histogram(
+    "evlens_analysis_rows_per_second", "CSV rows processed per second by a full analysis.", ROWS_PER_SECOND_BUCKETS
+)
+
+_collectors = [request_latency, stage_latency, stage_peak_rss, queue_depth_at_submit, rows_per_second]
+
+
+def register_gauge(name: str, documentation: str, read):
+    _collectors.append(Gauge(name, documentation, read))
+
+
+def register_counter(name: str, documentation: str, read):
+    _collectors.append(CallbackCounter(name, documentation, read))
+
+
+def observe_report(report: Dict[str, Any]):
+    """Record the '_timings' block of a freshly computed report"""
+    timings = report.get("_timings")
+    if not timings:
+        return
+    for stage, entry in timings.get("stages", {}).items():
+        stage_latency.observe(entry["seconds"], stage)
+        stage_peak_rss.observe(entry["peak_rss_mb"], stage)
+    if timings.get("rows_per_second"):
+        rows_per_second.observe(timings["rows_per_second"])
+
+
+def render() -> str:
+    lines = []
+    for collector in _collectors:
+        lines.extend(collector.render())
+    return "\n".join(lines) + "\n"
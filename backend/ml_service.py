@@ -3,21 +3,44 @@ Improved ML service for event review analysis
 """
 import sys
 import os
-
-# Optional ML imports (only if transformers is installed)
-try:
-    from transformers import pipeline
-    TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    TRANSFORMERS_AVAILABLE = False
-    pipeline = None
-
-from textblob import TextBlob
-import numpy as np
-import pandas as pd
-from typing import Dict, Any, List
+import shutil
+import time
+import importlib
+import importlib.util
+from collections import Counter
+from typing import Dict, Any, List, Callable
 import logging
 
+# Seconds spent importing the heavy dependencies in this process (filled in
+# as they load, reported at startup to keep an eye on cold starts)
+IMPORT_SECONDS: Dict[str, float] = {}
+
+
+def timed_import(name: str):
+    """Import a module, recording how long it took if it was not loaded yet"""
+    if name in sys.modules:
+        return sys.modules[name]
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_SECONDS[name] = round(time.perf_counter() - start, 3)
+    return module
+
+
+np = timed_import("numpy")
+pd = timed_import("pandas")
+
+# Optional ML imports (only if transformers is installed). transformers alone
+# takes seconds to import, so it is only loaded once the model is enabled.
+TRANSFORMERS_AVAILABLE = importlib.util.find_spec("transformers") is not None
+
+# Parquet/Feather/Arrow IPC uploads need pyarrow, which is optional as well
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+COLUMNAR_EXTENSIONS = (".parquet", ".pq", ".feather", ".arrow", ".ipc")
+
+# .csv.gz/.csv.bz2 are read with the standard library; .csv.zst needs zstandard
+ZSTD_AVAILABLE = importlib.util.find_spec("zstandard") is not None
+COMPRESSED_EXTENSIONS = (".gz", ".bz2", ".zst")
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -25,6 +48,34 @@ logger = logging.getLogger(__name__)
 # Global variable for model (lazy loading)
 _summarizer = None
 
+# Bump whenever analysis/summary output changes so cached results are not reused
+PIPELINE_VERSION = "10"
+
+# Files larger than this are analyzed in chunks to keep peak memory bounded.
+# Chunked mode reads the text columns twice (TF-IDF weights need the final
+# vocabulary), so it runs ~1.4x as long as in memory (25s vs 18s on a
+# 100k-row Instagram export).
+CHUNKED_ANALYSIS_MB = float(os.getenv("CHUNKED_ANALYSIS_MB", "50"))
+ANALYSIS_CHUNK_ROWS = int(os.getenv("ANALYSIS_CHUNK_ROWS", "50000"))
+
+# Peak RSS budget of one analysis worker in MB (0 = off). When set, each file is
+# analyzed in memory, in chunks (of at most ANALYSIS_CHUNK_ROWS rows) or from a
+# row sample, whichever its estimated footprint allows, instead of by file size.
+ANALYSIS_MEMORY_BUDGET_MB = float(os.getenv("ANALYSIS_MEMORY_BUDGET_MB", "0"))
+
+# Approximate sentiment (0 = off): score a sample of each text column, grown
+# until the positive/negative/neutral shares are known to within this width
+# at 95% confidence (see ml_src/approximate.py), instead of every review
+SENTIMENT_CI_WIDTH = float(os.getenv("SENTIMENT_CI_WIDTH", "0"))
+
+# Map-reduce summarization: model input budget per chunk, chunks per pipeline
+# call, and an optional cap on how many reviews (evenly spread) go into the
+# model. The default 0 summarizes all of them; summaries report
+# reviews_summarized out of reviews_total either way.
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "512"))
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "8"))
+SUMMARY_MAX_REVIEWS = int(os.getenv("SUMMARY_MAX_REVIEWS", "0"))
+
 
 def get_summarizer():
     """Lazy load the summarization model - DISABLED for Render free tier to save memory"""
@@ -47,6 +98,7 @@ def get_summarizer():
         
         logger.info("Loading summarization model...")
         try:
+            pipeline = timed_import("transformers").pipeline
             # Use a smaller, more memory-efficient model for Render free tier
             _summarizer = pipeline(
                 "summarization",
@@ -62,10 +114,8 @@ def get_summarizer():
     return _summarizer
 
 
-def analyze_csv_file(csv_path: str) -> Dict[str, Any]:
-    """Analyze CSV file and return report"""
-    import sys
-    import os
+def ensure_ml_src_path() -> str:
+    """Find the ML/src directory and make its modules importable"""
     # Try multiple paths to find ML/src directory
     current_dir = os.path.dirname(os.path.abspath(__file__))  # backend/
     root_dir = os.path.dirname(current_dir)  # project root
@@ -95,32 +145,144 @@ def analyze_csv_file(csv_path: str) -> Dict[str, Any]:
     
     if ml_src_dir not in sys.path:
         sys.path.insert(0, ml_src_dir)
-    
+    return ml_src_dir
+
+
+# Pipeline stages, resolved once per process by get_pipeline()
+PIPELINE_STAGES = ("detect", "text", "numeric", "gps", "sentiment", "summarize")
+_pipeline = None
+
+
+def load_analyzer(ml_src_dir: str):
+    """Import analyzer.py from ml_src_dir"""
     try:
         # Import directly from analyzer.py
-        from analyzer import analyze_csv
+        return importlib.import_module("analyzer")
     except ImportError as e:
         logger.error(f"Failed to import analyzer: {e}")
         logger.error(f"Python path: {sys.path}")
         logger.error(f"Looking for analyzer in: {ml_src_dir}")
         # Fallback: try to import with full path
-        import importlib.util
         analyzer_path = os.path.join(ml_src_dir, "analyzer.py")
         if os.path.exists(analyzer_path):
             spec = importlib.util.spec_from_file_location("analyzer", analyzer_path)
             analyzer_module = importlib.util.module_from_spec(spec)
             spec.loader.exec_module(analyzer_module)
-            analyze_csv = analyzer_module.analyze_csv
-        else:
-            raise ImportError(f"Could not find analyzer.py at {analyzer_path}")
-    
-    return analyze_csv(csv_path)
+            return analyzer_module
+        raise ImportError(f"Could not find analyzer.py at {analyzer_path}")
+
+
+def get_pipeline() -> Dict[str, Callable]:
+    """
+    Registry of analysis entry points. The ML/src lookup, sys.path change and
+    module imports happen on the first call only (at app startup, and once in
+    each worker process); requests just look callables up here.
+    """
+    global _pipeline
+    if _pipeline is None:
+        start = time.perf_counter()
+        ml_src_dir = ensure_ml_src_path()
+        timed_import("sklearn")
+        analyzer = load_analyzer(ml_src_dir)
+        sentiment = importlib.import_module("sentiment")
+        hierarchical = importlib.import_module("hierarchical")
+        review_store = importlib.import_module("review_store")
+        instrument = importlib.import_module("instrument")
+        cancellation = importlib.import_module("cancellation")
+        approximate = importlib.import_module("approximate")
+        progress = importlib.import_module("progress")
+        _pipeline = {
+            "analyze": analyzer.analyze_csv,
+            "detect": analyzer.detect_columns,
+            "text": analyzer.analyze_text_column,
+            "numeric": analyzer.analyze_numeric_column,
+            "gps": analyzer.analyze_gps,
+            # compiling the lexicon here keeps it off the first request
+            "sentiment": sentiment.get_scorer().score,
+            "sentiment_buckets": sentiment.sentiment_buckets,
+            "estimate_sentiment": approximate.estimate_sentiment,
+            "summarize": generate_summary_improved,
+            "summarize_chunks": hierarchical.summarize_hierarchical,
+            "read_reviews": review_store.read_reviews,
+            "store_columns": review_store.store_columns,
+            "timings": instrument.StageTimings,
+            "input_size": analyzer.input_size,
+            "estimate_rows": analyzer.estimate_rows,
+            "cancellable": cancellation.cancellable,
+            "cancelled_error": cancellation.AnalysisCancelled,
+            "started_path": cancellation.started_path,
+            "reporting": progress.reporting,
+        }
+        IMPORT_SECONDS["pipeline"] = round(time.perf_counter() - start, 3)
+    return _pipeline
+
+
+def startup_report() -> Dict[str, Any]:
+    """Resolve the pipeline and return import timings for the startup log"""
+    get_pipeline()
+    return {
+        "imports": dict(IMPORT_SECONDS),
+        "transformers": "not installed" if not TRANSFORMERS_AVAILABLE else (
+            "loaded" if "transformers" in sys.modules else "installed, not loaded"
+        ),
+        "stages": list(PIPELINE_STAGES),
+    }
 
 
-def generate_summary_improved(report: Dict[str, Any]) -> Dict[str, Any]:
+def warm_worker():
+    """Process pool initializer: resolve the pipeline before the first job"""
+    get_pipeline()
+
+
+def analyze_csv_file(csv_path: str, chunksize: int = None, review_store_dir: str = None, timings=None,
+                     group_by: List[str] = None) -> Dict[str, Any]:
+    """
+    Analyze a CSV (or Parquet/Feather/Arrow) file and return a compact report
+    (streamed in chunks for large files). The full review set goes to
+    review_store_dir when given; group_by adds per-group statistics. With
+    ANALYSIS_MEMORY_BUDGET_MB set the pipeline picks the strategy itself and
+    reports it under '_memory'. SENTIMENT_CI_WIDTH makes in-memory analyses
+    approximate.
+    """
+    ci_width = SENTIMENT_CI_WIDTH or None
+    if ANALYSIS_MEMORY_BUDGET_MB > 0:
+        return get_pipeline()["analyze"](
+            csv_path, chunksize=chunksize or ANALYSIS_CHUNK_ROWS, compact=True, review_store_dir=review_store_dir,
+            timings=timings, group_by=group_by, memory_budget_mb=ANALYSIS_MEMORY_BUDGET_MB,
+            sentiment_ci_width=ci_width
+        )
+    if chunksize is None and get_pipeline()["input_size"](csv_path) > CHUNKED_ANALYSIS_MB * 1024 * 1024:
+        chunksize = ANALYSIS_CHUNK_ROWS
+    return get_pipeline()["analyze"](
+        csv_path, chunksize=chunksize, compact=True, review_store_dir=review_store_dir, timings=timings,
+        group_by=group_by, sentiment_ci_width=ci_width
+    )
+
+
+def estimate_input(path: str) -> Dict[str, int]:
+    """Bytes the pipeline will parse and (estimated) rows of an upload, read from its head and metadata"""
+    stages = get_pipeline()
+    return {"bytes": stages["input_size"](path), "rows": stages["estimate_rows"](path)}
+
+
+def spread_sample(items: List[str], limit: int) -> List[str]:
+    """Evenly spaced subset of at most limit items (all of them if limit <= 0)"""
+    if limit <= 0 or len(items) <= limit:
+        return items
+    step = len(items) / limit
+    return [items[int(i * step)] for i in range(limit)]
+
+
+def generate_summary_improved(report: Dict[str, Any], reviews: List[str] = None,
+                              ci_width: float = None) -> Dict[str, Any]:
     """
     Improved summary generation that uses ALL reviews, not just samples.
     Also includes better sentiment analysis and key insights.
+    reviews is the full review list of the first text column; the report's
+    sample is used when it is not given. With ci_width set, reviews the
+    report has no sentiment for are sampled until each sentiment share is
+    known to within ci_width (see ml_src/approximate.py) instead of all
+    being scored; approximate sentiment is summarized with its intervals.
     """
     try:
         # Get all reviews from the analysis
@@ -141,13 +303,11 @@ def generate_summary_improved(report: Dict[str, Any]) -> Dict[str, Any]:
         text_col = text_columns[0]
         text_data = analysis.get(text_col, {})
         
-        # IMPORTANT: Use ALL reviews, not just samples
+        # The report only carries a bounded sample of reviews; counts and
+        # sentiment below come from the full column
         all_reviews = text_data.get("sample_reviews", [])
         n_reviews = text_data.get("n_reviews", len(all_reviews))
         
-        # If we have more reviews than samples, try to read the original CSV
-        # For now, we'll use what we have, but this is an improvement area
-        
         if not all_reviews:
             return {
                 "summary": "No reviews found in the dataset.",
@@ -155,16 +315,8 @@ def generate_summary_improved(report: Dict[str, Any]) -> Dict[str, Any]:
                 "key_insights": []
             }
         
-        # Combine all reviews
-        # Use longer text if available, but chunk for very long inputs
-        combined_text = " ".join(all_reviews)
-        
-        # Limit to reasonable length for the model (5000 chars)
-        if len(combined_text) > 5000:
-            # Take first 2500 and last 2500 chars to preserve context
-            combined_text = combined_text[:2500] + " " + combined_text[-2500:]
-        
         # Improved Sentiment Analysis
+        approximate = None
         if 'sentiment_data' in report:
             sentiment_data = report['sentiment_data']
             pos = sentiment_data.get('positive', 0)
@@ -176,25 +328,29 @@ def generate_summary_improved(report: Dict[str, Any]) -> Dict[str, Any]:
                 avg_sentiment = (pos - neg) / (pos + neg + neu)
             else:
                 avg_sentiment = 0.0
+        elif 'sentiment' in text_data:
+            # Scored over every review by the analyzer
+            column_sentiment = text_data['sentiment']
+            pos = column_sentiment.get('positive', 0)
+            neg = column_sentiment.get('negative', 0)
+            neu = column_sentiment.get('neutral', 0)
+            avg_sentiment = column_sentiment.get('average_polarity', 0.0)
+            approximate = column_sentiment.get('approximate')
+        elif ci_width:
+            estimate, _, _ = get_pipeline()["estimate_sentiment"](reviews or all_reviews, ci_width)
+            pos = estimate["positive"]
+            neg = estimate["negative"]
+            neu = estimate["neutral"]
+            avg_sentiment = estimate["average_polarity"]
+            approximate = estimate["approximate"]
         else:
-            sentiments = []
-            sentiment_scores = []
-            
-            for review in all_reviews:
-                blob = TextBlob(review)
-                polarity = blob.sentiment.polarity
-                subjectivity = blob.sentiment.subjectivity
-                sentiments.append({
-                    "polarity": float(polarity),
-                    "subjectivity": float(subjectivity),
-                    "text": review[:100]
-                })
-                sentiment_scores.append(polarity)
-            
-            sentiment_scores = np.array(sentiment_scores)
-            pos = int((sentiment_scores > 0.1).sum())
-            neg = int((sentiment_scores < -0.1).sum())
-            neu = len(sentiment_scores) - pos - neg
+            # Score every review in one batch (same buckets as TextBlob)
+            stages = get_pipeline()
+            sentiment_scores, _ = stages["sentiment"](all_reviews)
+            buckets = stages["sentiment_buckets"](sentiment_scores)
+            pos = buckets["positive"]
+            neg = buckets["negative"]
+            neu = buckets["neutral"]
             avg_sentiment = float(np.mean(sentiment_scores))
         
         # Determine overall sentiment
@@ -229,23 +385,33 @@ def generate_summary_improved(report: Dict[str, Any]) -> Dict[str, Any]:
             "average_sentiment_score": round(avg_sentiment, 3),
             "total_reviews": n_reviews
         }
+        if approximate is not None:
+            # shares are only known to within the intervals
+            sentiment_summary["approximate"] = approximate
+        
+        representative = text_data.get("representative_reviews", [])
         
         # Generate summary using the model
         summarizer = get_summarizer()
-        
-        # Better prompt for event review summarization
-        input_text = f"Summarize the following event reviews: {combined_text}"
+        summary_timings = []
+        summary_source = reviews if reviews else all_reviews
+        reviews_summarized = 0
         
         try:
             if summarizer is not None:
-                raw_summary = summarizer(
-                    input_text,
-                    max_length=150,
-                    min_length=40,
-                    do_sample=False,
-                    truncation=True
+                # Map-reduce over every review (or SUMMARY_MAX_REVIEWS of them)
+                # instead of one truncated call
+                summary_input = spread_sample(summary_source, SUMMARY_MAX_REVIEWS)
+                summary_text, summary_timings = get_pipeline()["summarize_chunks"](
+                    summary_input,
+                    summarizer,
+                    max_input_tokens=SUMMARY_CHUNK_TOKENS,
+                    batch_size=SUMMARY_BATCH_SIZE,
                 )
-                summary_text = raw_summary[0]["summary_text"].strip()
+                reviews_summarized = len(summary_input)
+                for timing in summary_timings:
+                    logger.info(f"Summary level {timing['level']}: {timing['inputs']} inputs -> "
+                                f"{timing['chunks']} chunks in {timing['seconds']}s")
             else:
                 # Fallback if model not loaded
                 raise Exception("Model not available")
@@ -262,12 +428,20 @@ def generate_summary_improved(report: Dict[str, Any]) -> Dict[str, Any]:
             summary_text = f"Analyzed {n_reviews} event reviews with {sentiment_desc} sentiment. " + \
                           f"Average review length: {text_data.get('avg_length_words', 0):.1f} words. " + \
                           f"Key themes include: {', '.join(key_insights[:3]) if key_insights else 'general feedback'}."
+            # Extractive summary: the reviews TextRank ranks most central
+            if representative:
+                summary_text += " Representative feedback: " + " ".join(representative[:3])
         
         return {
             "summary": summary_text,
+            "representative_reviews": representative,
             "sentiment_summary": sentiment_summary,
             "key_insights": key_insights,
-            "review_count": n_reviews
+            "review_count": n_reviews,
+            # reviews the model summarized (0 for the fallback summary) out of those available
+            "reviews_summarized": reviews_summarized,
+            "reviews_total": len(summary_source),
+            "summary_timings": summary_timings
         }
         
     except Exception as e:
@@ -278,3 +452,120 @@ def generate_summary_improved(report: Dict[str, Any]) -> Dict[str, Any]:
             "key_insights": []
         }
 
+
+
+def run_analysis(csv_path: str, review_store_dir: str = None, group_by: List[str] = None,
+                 cancel_path: str = None, events_path: str = None) -> Dict[str, Any]:
+    """
+    Run the full pipeline (analysis + summary) for one uploaded file.
+    Kept at module level so it can be sent to worker processes. Creating
+    cancel_path stops the run at its next checkpoint with AnalysisCancelled;
+    progress events are appended to events_path (see ml_src/progress.py).
+    """
+    stages = get_pipeline()
+    with stages["cancellable"](cancel_path), stages["reporting"](events_path):
+        return _run_analysis(csv_path, review_store_dir, group_by)
+
+
+def _run_analysis(csv_path, review_store_dir, group_by):
+    partial_dir = None
+    if review_store_dir:
+        # write next to the final location and rename once complete, so readers
+        # never see a half-written store
+        partial_dir = f"{review_store_dir}.partial-{os.getpid()}"
+        shutil.rmtree(partial_dir, ignore_errors=True)
+    stages = get_pipeline()
+    timings = stages["timings"]()
+    try:
+        report = analyze_csv_file(csv_path, review_store_dir=partial_dir, timings=timings, group_by=group_by)
+        reviews = load_summary_reviews(report, partial_dir)
+        if partial_dir and "error" not in report and not os.path.exists(review_store_dir):
+            try:
+                os.replace(partial_dir, review_store_dir)
+            except OSError:
+                # another worker analyzing the same upload renamed its store
+                # into place first; keep that one and drop ours below
+                pass
+    finally:
+        if partial_dir:
+            shutil.rmtree(partial_dir, ignore_errors=True)
+    with timings.stage("summarize"):
+        summary = stages["summarize"](report, reviews, ci_width=SENTIMENT_CI_WIDTH or None)
+    if "_timings" in report:
+        report["_timings"] = timings.as_dict(report.get("n_rows"))
+    return {"report": report, "summary": summary}
+
+
+def combine_reports(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Cross-event report for a batch: totals, pooled sentiment, keywords shared
+    by several files and the files ranked by average sentiment. results are
+    {"filename", "analysis_id", "report", "summary"} dicts of analyses that
+    succeeded.
+    """
+    files = []
+    keyword_files = Counter()
+    totals = Counter()
+    polarity_sum = 0.0
+    for result in results:
+        report, summary = result["report"], result["summary"]
+        sentiment = summary.get("sentiment_summary") or {}
+        text_columns = [c for c, t in report.get("columns", {}).items() if t == "text"]
+        keywords = report["analysis"].get(text_columns[0], {}).get("keywords", []) if text_columns else []
+        keyword_files.update(set(keywords))
+
+        n_reviews = sentiment.get("total_reviews", 0)
+        average = sentiment.get("average_sentiment_score", 0.0)
+        totals.update({
+            "n_rows": report.get("n_rows", 0),
+            "n_reviews": n_reviews,
+            "positive": sentiment.get("positive", 0),
+            "neutral": sentiment.get("neutral", 0),
+            "negative": sentiment.get("negative", 0),
+        })
+        polarity_sum += average * n_reviews
+        files.append({
+            "filename": result["filename"],
+            "analysis_id": result.get("analysis_id"),
+            "n_rows": report.get("n_rows", 0),
+            "n_reviews": n_reviews,
+            "overall_sentiment": sentiment.get("overall_sentiment"),
+            "average_sentiment_score": average,
+            "keywords": keywords[:5],
+        })
+
+    files.sort(key=lambda f: f["average_sentiment_score"], reverse=True)
+    return {
+        "n_files": len(files),
+        "n_rows": totals["n_rows"],
+        "n_reviews": totals["n_reviews"],
+        "sentiment_summary": {
+            "positive": totals["positive"],
+            "neutral": totals["neutral"],
+            "negative": totals["negative"],
+            # weighted by each file's review count
+            "average_sentiment_score": round(polarity_sum / totals["n_reviews"], 3) if totals["n_reviews"] else 0.0,
+        },
+        "shared_keywords": [
+            {"keyword": keyword, "files": count} for keyword, count in keyword_files.most_common(10) if count > 1
+        ],
+        "files": files,
+    }
+
+
+def load_summary_reviews(report: Dict[str, Any], store_dir: str = None) -> List[str]:
+    """
+    Full review list of the first text column, read back from the review
+    store. Only needed (and only loaded) when the summarization model is on.
+    """
+    if not store_dir or get_summarizer() is None:
+        return None
+    text_columns = [c for c, t in report.get("columns", {}).items() if t == "text"]
+    if not text_columns:
+        return None
+    stages = get_pipeline()
+    columns = stages["store_columns"](store_dir)
+    if text_columns[0] not in columns:
+        return None
+    _, reviews = stages["read_reviews"](store_dir, text_columns[0], 0, columns[text_columns[0]]["count"])
+    return reviews
@@ -0,0 +1,59 @@
+"""
+Cooperative cancellation of a running analysis.
+
+The caller picks a flag path that does not exist yet and runs the analysis
+inside cancellable(path); whoever wants it stopped creates the file. The
+pipeline calls checkpoint() at every stage boundary (StageTimings.stage),
+per chunk and between sentiment batches, and checkpoint() raises
+AnalysisCancelled once the flag exists. A file works across the process
+pool without shared memory or a manager process, and checking it is one
+stat() per checkpoint.
+
+Entering cancellable(path) also creates started_path(path). ProcessPoolExecutor
+marks a future running as soon as it hands it to its call queue (up to
+workers + 1 of them), so the caller uses this marker to tell when a worker
+has really picked the analysis up, e.g. to start its timeout only then.
+"""
+import os
+from contextlib import contextmanager
+
+
+class AnalysisCancelled(BaseException):
+    """
+    Raised at a checkpoint of a cancelled analysis. A BaseException (like
+    KeyboardInterrupt) so the pipeline's broad 'except Exception' fallbacks
+    let it through.
+    """
+
+
+# flag path of the analysis running in this process (a worker runs one at a time)
+_flag_path = None
+
+
+def started_path(path):
+    """Marker created once the analysis cancelled by path starts running"""
+    return f'{path}.started'
+
+
+@contextmanager
+def cancellable(path):
+    """Run the enclosed analysis so that creating path cancels it (no-op for None)"""
+    global _flag_path
+    if path:
+        with open(started_path(path), 'w'):
+            pass
+    previous, _flag_path = _flag_path, path
+    try:
+        yield
+    finally:
+        _flag_path = previous
+
+
+def cancelled() -> bool:
+    return _flag_path is not None and os.path.exists(_flag_path)
+
+
+def checkpoint():
+    """Raise AnalysisCancelled if the running analysis was cancelled"""
+    if cancelled():
+        raise AnalysisCancelled()
@@ -0,0 +1,132 @@
+"""
+Parquet / Feather / Arrow IPC input for the analyzer (needs pyarrow).
+
+Column types are detected from the first rows only, then just the columns
+the pipeline uses (text, numeric, lat/lon, postSentiment) are read. Feather
+and Arrow IPC files are memory-mapped, so uncompressed buffers are used in
+place instead of being copied into memory; Parquet is decoded column by
+column from a memory-mapped file.
+"""
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = pq = None
+    PYARROW_AVAILABLE = False
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+IPC_EXTENSIONS = ('.feather', '.arrow', '.ipc')
+COLUMNAR_EXTENSIONS = PARQUET_EXTENSIONS + IPC_EXTENSIONS
+
+# rows read for column type detection
+SAMPLE_ROWS = 10000
+
+
+def is_columnar(path: str) -> bool:
+    return path.lower().endswith(COLUMNAR_EXTENSIONS)
+
+
+def _require_pyarrow():
+    if not PYARROW_AVAILABLE:
+        raise ImportError("Reading Parquet/Feather/Arrow files requires pyarrow (pip install pyarrow)")
+
+
+def _is_parquet(path):
+    return path.lower().endswith(PARQUET_EXTENSIONS)
+
+
+def _ipc_reader(path):
+    source = pa.memory_map(path, 'r')
+    try:
+        return pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        # Arrow IPC stream format (no footer)
+        source.seek(0)
+        return pa.ipc.open_stream(source)
+
+
+def schema_info(path: str):
+    """Return (column names, number of rows or None if unknown without a full scan)"""
+    _require_pyarrow()
+    if _is_parquet(path):
+        meta = pq.ParquetFile(path, memory_map=True).metadata
+        return meta.schema.to_arrow_schema().names, meta.num_rows
+    reader = _ipc_reader(path)
+    rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches)) \
+        if hasattr(reader, 'num_record_batches') else None
+    return reader.schema.names, rows
+
+
+def input_size(path: str) -> int:
+    """
+    Bytes of data in a file, for choosing chunked mode: the uncompressed size
+    for Parquet (often 5-10x its size on disk), the file size otherwise
+    """
+    if _is_parquet(path) and PYARROW_AVAILABLE:
+        meta = pq.ParquetFile(path, memory_map=True).metadata
+        return sum(meta.row_group(i).total_byte_size for i in range(meta.num_row_groups))
+    return os.path.getsize(path)
+
+
+def read_sample(path: str, n: int = SAMPLE_ROWS):
+    """First n rows (all columns) as a DataFrame, for detect_columns"""
+    _require_pyarrow()
+    if _is_parquet(path):
+        batches = pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=n)
+        batch = next(batches, None)
+        if batch is None:
+            return pq.read_schema(path).empty_table().to_pandas()
+        return batch.to_pandas()
+    reader = _ipc_reader(path)
+    batches, rows = [], 0
+    for batch in _ipc_batches(reader):
+        batches.append(batch)
+        rows += batch.num_rows
+        if rows >= n:
+            break
+    return pa.Table.from_batches(batches, schema=reader.schema).slice(0, n).to_pandas()
+
+
+def _ipc_batches(reader):
+    if hasattr(reader, 'num_record_batches'):
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+    else:
+        yield from reader
+
+
+def read_columns(path: str, columns):
+    """The given columns of the whole file as a DataFrame"""
+    _require_pyarrow()
+    if _is_parquet(path):
+        table = pq.read_table(path, columns=list(columns), memory_map=True)
+    else:
+        table = _ipc_reader(path).read_all().select(list(columns))
+    return table.to_pandas()
+
+
+def iter_frames(path: str, columns, batch_rows: int):
+    """The given columns as DataFrames of about batch_rows rows each"""
+    _require_pyarrow()
+    columns = list(columns)
+    if _is_parquet(path):
+        for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=batch_rows, columns=columns):
+            yield batch.to_pandas()
+        return
+    # re-slice record batches (of whatever size the writer chose) into batch_rows rows
+    pending, rows = [], 0
+    for batch in _ipc_batches(_ipc_reader(path)):
+        pending.append(batch.select(columns))
+        rows += batch.num_rows
+        if rows >= batch_rows:
+            table = pa.Table.from_batches(pending)
+            start = 0
+            while rows - start >= batch_rows:
+                yield table.slice(start, batch_rows).to_pandas()
+                start += batch_rows
+            pending, rows = table.slice(start).to_batches(), rows - start
+    if rows:
+        yield pa.Table.from_batches(pending).to_pandas()
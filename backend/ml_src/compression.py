@@ -0,0 +1,76 @@
+"""
+Compressed CSV input (.csv.gz, .csv.bz2, .csv.zst).
+
+Uploads stay compressed on disk; read_csv infers the codec from the
+extension and decompresses block by block as it parses, in memory and in
+chunked mode alike, so the uncompressed CSV is never written out. zstd
+needs the optional zstandard package.
+"""
+import os
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+COMPRESSED_EXTENSIONS = ('.gz', '.bz2', '.zst')
+# expansion assumed when a file does not record its uncompressed size (typical of CSV exports)
+ASSUMED_RATIO = 6
+
+
+def is_compressed(path: str) -> bool:
+    return path.lower().endswith(COMPRESSED_EXTENSIONS)
+
+
+def _gzip_size(path, size):
+    """ISIZE from the gzip trailer: the uncompressed size mod 2^32 (of the last member only)"""
+    with open(path, 'rb') as f:
+        f.seek(-4, os.SEEK_END)
+        isize = int.from_bytes(f.read(4), 'little')
+    # smaller than the file means it wrapped past 4GB or the file has several members
+    return isize if isize >= size else None
+
+
+def _zstd_size(path):
+    """Content size from the first zstd frame header, if the compressor recorded it"""
+    if not ZSTD_AVAILABLE:
+        return None
+    with open(path, 'rb') as f:
+        header = f.read(18)
+    try:
+        content_size = zstandard.get_frame_parameters(header).content_size
+    except zstandard.ZstdError:
+        return None
+    return content_size if 0 < content_size < zstandard.CONTENTSIZE_UNKNOWN else None
+
+
+def uncompressed_size(path: str) -> int:
+    """Uncompressed bytes of a compressed CSV: from its header/trailer when recorded, else estimated"""
+    size = os.path.getsize(path)
+    lower = path.lower()
+    known = None
+    if lower.endswith('.gz') and size >= 18:
+        known = _gzip_size(path, size)
+    elif lower.endswith('.zst'):
+        known = _zstd_size(path)
+    return known if known is not None else size * ASSUMED_RATIO
+
+
+def read_head(path: str, n_bytes: int) -> bytes:
+    """First n_bytes of a file's content, decompressed if it is .gz/.bz2/.zst"""
+    lower = path.lower()
+    if lower.endswith('.gz'):
+        import gzip
+        with gzip.open(path, 'rb') as f:
+            return f.read(n_bytes)
+    if lower.endswith('.bz2'):
+        import bz2
+        with bz2.open(path, 'rb') as f:
+            return f.read(n_bytes)
+    if lower.endswith('.zst') and ZSTD_AVAILABLE:
+        with open(path, 'rb') as raw, zstandard.ZstdDecompressor().stream_reader(raw) as f:
+            return f.read(n_bytes)
+    with open(path, 'rb') as f:
+        return f.read(n_bytes)
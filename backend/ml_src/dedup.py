@@ -0,0 +1,258 @@
+"""
+Exact and near-duplicate grouping of review texts.
+
+Exact duplicates are grouped by value. The distinct texts then get MinHash
+signatures over word shingles, and LSH banding proposes candidate pairs:
+texts whose signatures agree on a whole band are compared, and pairs whose
+signatures agree on at least NEAR_DUP_THRESHOLD of the hashes (an estimate
+of the Jaccard similarity of their shingle sets) join the same group.
+
+The text pipeline scores sentiment once per distinct text and fans the
+polarity back out to every copy; it is not shared between near duplicates,
+since one changed word can flip a review. Keywords and representative
+reviews see one text per near-duplicate group, so a post copied onto every
+comment row (with or without small edits) counts as a single document.
+"""
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+NUM_PERM = 64
+BAND_ROWS = 4  # 16 bands of 4 rows: pairs above ~0.5 similarity become candidates
+SHINGLE_WORDS = 3
+NEAR_DUP_THRESHOLD = 0.8
+# texts shingled and hashed at once (their words are Python strings until hashed)
+SIGNATURE_BATCH = 10000
+# candidate pairs whose signatures are compared at once (2 x 256 bytes each)
+PAIR_BATCH = 32768
+# stream dedup stops remembering new texts past this many (16 bytes each, 32MB at the cap)
+MAX_TRACKED_TEXTS = 2000000
+
+_rng = np.random.default_rng(20240607)
+_PERM_A = _rng.integers(1, 1 << 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _rng.integers(0, 1 << 63, NUM_PERM, dtype=np.uint64)
+_SHINGLE_MULT = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9], dtype=np.uint64)
+
+
+def _mix(x):
+    """splitmix64 finalizer, so that similar shingle codes get unrelated hashes"""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _shingles(texts):
+    """(doc index, shingle hash) arrays for word SHINGLE_WORDS-grams; short texts use their words"""
+    s = pd.Series(texts, dtype=object).str.lower().str.replace(r'[^\w\s]', ' ', regex=True)
+    words = s.str.split().explode().dropna()
+    doc = words.index.to_numpy()
+    # a stable hash rather than factorize codes, so shingles agree across batches
+    codes = pd.util.hash_array(words.to_numpy())
+    lengths = np.bincount(doc, minlength=len(texts))
+
+    with np.errstate(over='ignore'):
+        k = SHINGLE_WORDS
+        n = len(codes)
+        if n >= k:
+            # shingle i covers words i..i+k-1 and is valid if they are all in one doc
+            combined = sum(codes[j:n - k + 1 + j] * _SHINGLE_MULT[j] for j in range(k))
+            valid = doc[:n - k + 1] == doc[k - 1:]
+            shingle_doc, shingle_hash = doc[:n - k + 1][valid], _mix(combined[valid])
+        else:
+            shingle_doc, shingle_hash = np.zeros(0, dtype=doc.dtype), np.zeros(0, dtype=np.uint64)
+        short = (lengths[doc] < k)
+        shingle_doc = np.concatenate([shingle_doc, doc[short]])
+        shingle_hash = np.concatenate([shingle_hash, _mix(codes[short] + np.uint64(1))])
+    order = np.argsort(shingle_doc, kind='stable')
+    return shingle_doc[order], shingle_hash[order]
+
+
+def minhash_signatures(texts):
+    """(n, NUM_PERM) uint32 MinHash signatures, and a mask of texts that have any words"""
+    n = len(texts)
+    signatures = np.zeros((n, NUM_PERM), dtype=np.uint32)
+    has_words = np.zeros(n, dtype=bool)
+    for offset in range(0, n, SIGNATURE_BATCH):
+        doc, hashes = _shingles(texts[offset:offset + SIGNATURE_BATCH])
+        if not len(doc):
+            continue
+        starts = np.flatnonzero(np.r_[True, doc[1:] != doc[:-1]])
+        rows = offset + doc[starts]
+        has_words[rows] = True
+        with np.errstate(over='ignore'):
+            for j in range(NUM_PERM):
+                # multiply-shift hashing: top 32 bits of a*x + b mod 2^64
+                values = ((_PERM_A[j] * hashes + _PERM_B[j]) >> np.uint64(32)).astype(np.uint32)
+                signatures[rows, j] = np.minimum.reduceat(values, starts)
+    return signatures, has_words
+
+
+def near_duplicate_labels(texts, threshold=NEAR_DUP_THRESHOLD):
+    """Group label per text; texts whose estimated shingle similarity reaches threshold share a label"""
+    n = len(texts)
+    if n < 2:
+        return np.arange(n)
+    signatures, has_words = minhash_signatures(texts)
+    candidates = np.flatnonzero(has_words)
+    src, dst = [], []
+    for start in range(0, NUM_PERM, BAND_ROWS):
+        # one 64-bit key per band; collisions only cost a comparison below
+        band = signatures[candidates, start:start + BAND_ROWS].astype(np.uint64)
+        keys = np.zeros(len(candidates), dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            for j in range(BAND_ROWS):
+                keys = _mix(keys ^ band[:, j])
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        # compare every bucket member with the bucket's first member only
+        leader = first[inverse.ravel()]
+        pair = leader != np.arange(len(candidates))
+        src.append(candidates[pair])
+        dst.append(candidates[leader[pair]])
+    # near-identical texts share a bucket in most bands: compare each pair once
+    pairs = np.unique(np.concatenate(src).astype(np.int64) * n + np.concatenate(dst))
+    src, dst = pairs // n, pairs % n
+    close = np.zeros(len(pairs), dtype=bool)
+    for start in range(0, len(pairs), PAIR_BATCH):
+        # bounded batches: gathering every pair's signatures at once costs 512 bytes a pair
+        s, d = src[start:start + PAIR_BATCH], dst[start:start + PAIR_BATCH]
+        close[start:start + PAIR_BATCH] = (signatures[s] == signatures[d]).mean(axis=1) >= threshold
+    src, dst = src[close], dst[close]
+    graph = coo_matrix((np.ones(len(src)), (src, dst)), shape=(n, n))
+    return connected_components(graph, directed=False)[1]
+
+
+class Duplicates:
+    """
+    Grouping of n texts. exact[i] is the index of text i among the distinct
+    texts and labels[i] its near-duplicate group; first and distinct_first
+    hold the index of the first text of every group / distinct text, and
+    counts the group sizes.
+    """
+
+    def __init__(self, exact, labels):
+        self.exact = exact
+        self.distinct_first = np.unique(exact, return_index=True)[1]
+        # renumber groups in order of first appearance
+        _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+        order = np.argsort(first, kind='stable')
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        self.labels = rank[inverse.ravel()]
+        self.first = first[order]
+        self.counts = np.bincount(self.labels, minlength=len(self.first))
+
+    @property
+    def n_groups(self):
+        return len(self.first)
+
+    @property
+    def n_distinct(self):
+        return len(self.distinct_first)
+
+    def unique(self, texts):
+        """First text of every near-duplicate group"""
+        return [texts[i] for i in self.first]
+
+    def distinct(self, texts):
+        """Every distinct text once"""
+        return [texts[i] for i in self.distinct_first]
+
+    def fan_out(self, values):
+        """Per-group values (one per unique() text) expanded to one per input text"""
+        return np.asarray(values)[self.labels]
+
+    def fan_out_distinct(self, values):
+        """Per-distinct-text values (one per distinct() text) expanded to one per input text"""
+        return np.asarray(values)[self.exact]
+
+    def summary(self):
+        n = len(self.labels)
+        return {
+            'distinct_texts': int(self.n_distinct),
+            'groups': int(self.n_groups),
+            'dedup_ratio': round(1 - self.n_groups / n, 4) if n else 0.0,
+        }
+
+
+def find_duplicates(texts, threshold=NEAR_DUP_THRESHOLD):
+    """Exact duplicates by value, then near duplicates among the distinct texts"""
+    exact, distinct = pd.factorize(pd.Series(texts, dtype=object))
+    near = near_duplicate_labels(list(distinct), threshold)
+    return Duplicates(exact, near[exact])
+
+
+def text_hashes(texts):
+    """Stable 64-bit hash per text (the same in every process)"""
+    return pd.util.hash_pandas_object(pd.Series(texts, dtype=object), index=False).to_numpy()
+
+
+class StreamDuplicates:
+    """
+    Duplicate grouping across chunks: exact repeats of texts from earlier
+    chunks (by 64-bit hash), near duplicates within each chunk. Remembers a
+    value per distinct text (e.g. its polarity) so repeats are not scored again.
+    Hashes are kept sorted in a uint64 array with their values alongside.
+    """
+
+    def __init__(self, max_tracked=MAX_TRACKED_TEXTS):
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.values = np.zeros(0, dtype='float64')
+        self.max_tracked = max_tracked
+        self.n = 0
+        self.n_groups = 0
+        self.n_distinct = 0
+
+    def lookup(self, hashes):
+        """Remembered value of each hash, NaN for hashes not seen before"""
+        pos = np.searchsorted(self.keys, hashes)
+        found = pos < len(self.keys)
+        found[found] = self.keys[pos[found]] == hashes[found]
+        prior = np.full(len(hashes), np.nan)
+        prior[found] = self.values[pos[found]]
+        return prior
+
+    def update(self, texts):
+        """
+        Group a chunk. Returns (dups, prior, new_groups): the chunk's grouping,
+        the value remembered for each distinct text (NaN if not seen before) and
+        the indices of the groups whose first text is new.
+        """
+        dups = find_duplicates(texts)
+        hashes = text_hashes(dups.distinct(texts))
+        prior = self.lookup(hashes)
+        self._new = np.isnan(prior)
+        self._hashes = hashes[self._new]
+        new_groups = np.flatnonzero(self._new[dups.exact[dups.first]])
+        self.n += len(texts)
+        self.n_groups += len(new_groups)
+        self.n_distinct += len(self._hashes)
+        return dups, prior, new_groups
+
+    def remember(self, values):
+        """Store the values (one per distinct text of the last update()) of texts not seen before"""
+        self._add(self._hashes, np.asarray(values, dtype='float64')[self._new])
+
+    def _add(self, hashes, values):
+        room = self.max_tracked - len(self.keys)
+        if room <= 0 or not len(hashes):
+            return
+        # two distinct texts may share a hash; keep the first
+        hashes, first = np.unique(hashes[:room], return_index=True)
+        pos = np.searchsorted(self.keys, hashes)
+        self.keys = np.insert(self.keys, pos, hashes)
+        self.values = np.insert(self.values, pos, values[:room][first])
+
+    def merge(self, other: 'StreamDuplicates'):
+        self.n += other.n
+        self.n_groups += other.n_groups
+        self.n_distinct += other.n_distinct
+        new = np.isnan(self.lookup(other.keys))
+        self._add(other.keys[new], other.values[new])
+
+    def summary(self):
+        return {
+            'distinct_texts': int(self.n_distinct),
+            'groups': int(self.n_groups),
+            'dedup_ratio': round(1 - self.n_groups / self.n, 4) if self.n else 0.0,
+        }
@@ -0,0 +1,233 @@
+"""
+Per-group analysis (e.g. per event and platform) alongside the global report.
+
+Every row gets a group code from one groupby().ngroup() over the group-by
+columns. Numeric stats are one groupby aggregation per frame, sentiment
+buckets one bincount over (group, bucket) codes, and keywords one sparse
+product of a (groups x texts) indicator matrix with the column's TF-IDF
+matrix, so the cost does not grow with the number of groups. State is
+mergeable across chunks: in-memory mode makes one update, chunked mode one
+per chunk.
+
+Groups are not split across processes. An analysis already runs in its own
+pool worker, the grouped work is a small share of it (for 100k rows, about
+0.15s of 23s with one group and 0.7s with 98k groups), and fanning it out
+would mean copying the frame and TF-IDF matrices to other processes.
+"""
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix, csr_matrix
+
+from sentiment import POSITIVE_THRESHOLD, NEGATIVE_THRESHOLD
+from streaming import exact_floats
+
+# groups listed in the report, largest first (all of them are still computed)
+MAX_REPORTED_GROUPS = 500
+MISSING_KEY = '(missing)'
+
+
+def _grow(array, n, fill=0.0):
+    if len(array) >= n:
+        return array
+    return np.concatenate([array, np.full(n - len(array), fill)])
+
+
+class _Moments:
+    """Per-group count, mean, M2, min and max of one numeric column"""
+
+    def __init__(self):
+        self.count = np.zeros(0)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self.min = np.zeros(0)
+        self.max = np.zeros(0)
+
+    def update(self, values: pd.Series, codes, n_groups):
+        self.count, self.mean, self.m2 = (_grow(a, n_groups) for a in (self.count, self.mean, self.m2))
+        self.min, self.max = _grow(self.min, n_groups, np.inf), _grow(self.max, n_groups, -np.inf)
+        # moments in float64 from float32 values' decimal form, like min/max (see exact_float)
+        grouped = pd.Series(exact_floats(values.to_numpy()), index=values.index).groupby(codes)
+        agg = grouped.agg(['count', 'mean', 'var'])
+        extremes = values.groupby(codes).agg(['min', 'max'])
+        agg = agg[agg['count'] > 0]
+        extremes = extremes.reindex(agg.index)
+        idx = agg.index.to_numpy()
+        n = agg['count'].to_numpy(dtype='float64')
+        mean = agg['mean'].to_numpy()
+        m2 = np.nan_to_num(agg['var'].to_numpy()) * (n - 1)
+        # Chan et al. parallel merge, as in NumericAccumulator
+        total = self.count[idx] + n
+        delta = mean - self.mean[idx]
+        self.m2[idx] += m2 + delta * delta * self.count[idx] * n / total
+        self.mean[idx] += delta * n / total
+        self.count[idx] = total
+        lo = exact_floats(extremes['min'].to_numpy())
+        hi = exact_floats(extremes['max'].to_numpy())
+        self.min[idx] = np.minimum(self.min[idx], lo)
+        self.max[idx] = np.maximum(self.max[idx], hi)
+
+    def result(self, g):
+        count = int(self.count[g]) if g < len(self.count) else 0
+        if not count:
+            return {'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None}
+        return {
+            'count': count,
+            'mean': float(self.mean[g]),
+            'std': float(np.sqrt(self.m2[g] / (count - 1))) if count > 1 else float('nan'),
+            'min': float(self.min[g]),
+            'max': float(self.max[g]),
+        }
+
+
+class _TextGroups:
+    """Per-group review count, sentiment buckets, polarity sum and TF-IDF sums of one text column"""
+
+    def __init__(self):
+        self.buckets = np.zeros((0, 3))  # positive, negative, neutral
+        self.polarity_sum = np.zeros(0)
+        self.terms = None
+        self.weights = None
+
+    def add_sentiment(self, codes, polarity, n_groups):
+        polarity = np.asarray(polarity)
+        bucket = np.where(polarity > POSITIVE_THRESHOLD, 0, np.where(polarity < NEGATIVE_THRESHOLD, 1, 2))
+        counts = np.bincount(codes * 3 + bucket, minlength=n_groups * 3).reshape(n_groups, 3)
+        if len(self.buckets) < n_groups:
+            self.buckets = np.vstack([self.buckets, np.zeros((n_groups - len(self.buckets), 3))])
+        self.buckets[:n_groups] += counts
+        self.polarity_sum = _grow(self.polarity_sum, n_groups)
+        self.polarity_sum[:n_groups] += np.bincount(codes, weights=polarity, minlength=n_groups)
+
+    def add_keywords(self, codes, labels, X, terms, n_groups):
+        """
+        codes/labels give each review's group and its row of X (one row per
+        distinct text); every text counts once per group it appears in
+        """
+        if X is None or not len(codes):
+            return
+        indicator = coo_matrix((np.ones(len(codes)), (codes, labels)), shape=(n_groups, X.shape[0])).tocsr()
+        indicator.data[:] = 1.0
+        sums = csr_matrix(indicator @ X)
+        if self.weights is None:
+            self.terms, self.weights = np.asarray(terms), sums
+            return
+        if self.weights.shape[0] < n_groups:
+            self.weights.resize((n_groups, self.weights.shape[1]))
+        self.weights = self.weights + sums
+
+    def top_keywords(self, g, k):
+        if self.weights is None or g >= self.weights.shape[0]:
+            return []
+        row = self.weights.getrow(g)
+        top = row.indices[np.argsort(-row.data, kind='stable')[:k]]
+        return [str(t) for t in self.terms[top]]
+
+    def result(self, g, k):
+        if g >= len(self.buckets):
+            counts, n = np.zeros(3), 0
+        else:
+            counts = self.buckets[g]
+            n = int(counts.sum())
+        return {
+            'n_reviews': n,
+            'keywords': self.top_keywords(g, k),
+            'sentiment': {
+                'positive': int(counts[0]),
+                'negative': int(counts[1]),
+                'neutral': int(counts[2]),
+                'average_polarity': float(self.polarity_sum[g] / n) if n else 0.0,
+            },
+        }
+
+
+class GroupAccumulator:
+    """Mergeable per-group state for the columns in group_by, keyed by the tuple of their values"""
+
+    def __init__(self, group_by):
+        self.group_by = list(group_by)
+        self.index = {}
+        self.keys = []
+        self.n_rows = np.zeros(0)
+        self.numeric = {}
+        self.text = {}
+        # postSentiment value -> per-group count
+        self.sentiment_counts = None
+
+    @property
+    def n_groups(self):
+        return len(self.keys)
+
+    def codes(self, frame: pd.DataFrame):
+        """Global group code of every row of frame (new keys get new codes)"""
+        keys = frame[self.group_by].astype(object)
+        keys = keys.where(keys.notna(), MISSING_KEY).astype(str)
+        local = keys.groupby(self.group_by, sort=False).ngroup().to_numpy()
+        first = np.unique(local, return_index=True)[1]
+        mapping = np.empty(len(first), dtype=np.int64)
+        for i, key in enumerate(keys.iloc[first].itertuples(index=False, name=None)):
+            code = self.index.get(key)
+            if code is None:
+                code = self.index[key] = len(self.keys)
+                self.keys.append(key)
+            mapping[i] = code
+        return mapping[local]
+
+    def update(self, frame: pd.DataFrame, numeric_columns=()):
+        """Row counts, numeric moments and postSentiment counts of a frame; returns its group codes"""
+        codes = self.codes(frame)
+        n = self.n_groups
+        self.n_rows = _grow(self.n_rows, n)
+        self.n_rows[:n] += np.bincount(codes, minlength=n)
+        for c in numeric_columns:
+            self.numeric.setdefault(c, _Moments()).update(pd.to_numeric(frame[c], errors='coerce'), codes, n)
+        if 'postSentiment' in frame.columns:
+            if self.sentiment_counts is None:
+                self.sentiment_counts = {}
+            # one bincount over (group, label) codes; NaN labels get -1
+            labels, values = pd.factorize(frame['postSentiment'].astype(object))
+            valid = labels >= 0
+            tallies = np.bincount(codes[valid] * len(values) + labels[valid],
+                                  minlength=n * len(values)).reshape(n, len(values))
+            for j, value in enumerate(values):
+                counts = _grow(self.sentiment_counts.get(value, np.zeros(0)), n)
+                counts[:n] += tallies[:, j]
+                self.sentiment_counts[value] = counts
+        return codes
+
+    def add_sentiment(self, column, codes, polarity):
+        self.text.setdefault(column, _TextGroups()).add_sentiment(codes, polarity, self.n_groups)
+
+    def add_keywords(self, column, codes, labels, X, terms):
+        self.text.setdefault(column, _TextGroups()).add_keywords(codes, labels, X, terms, self.n_groups)
+
+    def _sentiment_count(self, label, g):
+        counts = self.sentiment_counts.get(label)
+        return int(counts[g]) if counts is not None and g < len(counts) else 0
+
+    def result(self, k=8, max_groups=MAX_REPORTED_GROUPS):
+        order = np.argsort(-self.n_rows, kind='stable')[:max_groups]
+        groups = []
+        for g in order.tolist():
+            entry = {
+                'key': dict(zip(self.group_by, self.keys[g])),
+                'n_rows': int(self.n_rows[g]),
+                'analysis': {},
+            }
+            for c, text in self.text.items():
+                entry['analysis'][c] = text.result(g, k)
+            for c, moments in self.numeric.items():
+                entry['analysis'][c] = moments.result(g)
+            if self.sentiment_counts is not None:
+                entry['sentiment_data'] = {
+                    'positive': self._sentiment_count('positive', g),
+                    'neutral': self._sentiment_count('neutral', g),
+                    'negative': self._sentiment_count('negative', g),
+                    'total': int(self.n_rows[g]),
+                }
+            groups.append(entry)
+        return {
+            'by': self.group_by,
+            'n_groups': self.n_groups,
+            'truncated': self.n_groups > len(groups),
+            'groups': groups,
+        }
@@ -0,0 +1,86 @@
+"""
+Map-reduce summarization of many reviews with a seq2seq pipeline.
+
+Reviews are packed into chunks that fit the model's input budget, every chunk
+is summarized (in batched pipeline calls), and the chunk summaries are packed
+and summarized again until a single summary is left. Every review reaches the
+model, and the number of model calls grows linearly with the input instead of
+being capped by a character cut-off.
+"""
+import time
+
+from cancellation import checkpoint
+
+DEFAULT_PREFIX = "Summarize the following event reviews: "
+MAX_LEVELS = 8
+
+
+def count_tokens(texts, tokenizer=None):
+    """Token length of each text (whitespace words when no tokenizer is given)"""
+    if not texts:
+        return []
+    if tokenizer is None:
+        return [len(t.split()) for t in texts]
+    ids = tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+    return [len(x) for x in ids]
+
+
+def pack_chunks(texts, lengths, max_tokens):
+    """
+    Greedily pack texts, in order, into chunks of at most max_tokens tokens.
+    A text longer than the budget gets a chunk of its own (the pipeline
+    truncates it).
+    """
+    chunks, current, used = [], [], 0
+    for text, n in zip(texts, lengths):
+        if current and used + n > max_tokens:
+            chunks.append(" ".join(current))
+            current, used = [], 0
+        current.append(text)
+        used += n
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def summarize_hierarchical(texts, summarizer, max_input_tokens=512, batch_size=8, prefix=DEFAULT_PREFIX,
+                           chunk_max_length=96, chunk_min_length=16, max_length=150, min_length=40):
+    """
+    Summarize any number of texts with a transformers summarization pipeline.
+
+    Returns (summary, timings) where timings has one entry per level:
+    {'level', 'inputs', 'chunks', 'seconds'}.
+    """
+    tokenizer = getattr(summarizer, "tokenizer", None)
+    budget = max(1, max_input_tokens - count_tokens([prefix], tokenizer)[0] - 2)
+    texts = [t for t in texts if t and t.strip()]
+    timings = []
+    if not texts:
+        return "", timings
+
+    for level in range(MAX_LEVELS):
+        checkpoint()
+        start = time.perf_counter()
+        chunks = pack_chunks(texts, count_tokens(texts, tokenizer), budget)
+        final = len(chunks) == 1 or level == MAX_LEVELS - 1
+        if final and len(chunks) > 1:
+            # out of levels: keep the first chunk's worth of summaries
+            chunks = chunks[:1]
+        outputs = summarizer(
+            [prefix + chunk for chunk in chunks],
+            batch_size=batch_size,
+            max_length=max_length if final else chunk_max_length,
+            min_length=min_length if final else chunk_min_length,
+            do_sample=False,
+            truncation=True,
+        )
+        summaries = [o["summary_text"].strip() for o in outputs]
+        timings.append({
+            "level": level,
+            "inputs": len(texts),
+            "chunks": len(chunks),
+            "seconds": round(time.perf_counter() - start, 3),
+        })
+        if final:
+            return summaries[0], timings
+        texts = summaries
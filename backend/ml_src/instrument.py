@@ -0,0 +1,126 @@
+"""
+Per-stage wall time and peak memory for the analysis pipeline.
+
+Peak memory is the process's peak RSS while the stage ran. On Linux the
+kernel's high-water mark (VmHWM) is reset at the start of every stage by
+writing "5" to /proc/self/clear_refs, so each stage gets its own peak rather
+than the process lifetime's. Elsewhere the lifetime peak from getrusage is
+reported instead.
+
+Entering a stage is also a cancellation checkpoint (see cancellation.py),
+and stage starts and ends are progress events (see progress.py).
+"""
+import sys
+import time
+from contextlib import contextmanager
+
+from cancellation import checkpoint
+from progress import emit
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    """Peak RSS in MB since the last reset (or process start)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0.0
+    # ru_maxrss is KB on Linux and bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def current_rss_mb():
+    """Resident set size in MB right now (the peak so far where /proc is not available)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+class StageTimings:
+    """
+    Collects {stage: {'seconds', 'peak_rss_mb', 'calls'}}. Stages may nest
+    (e.g. 'text' around 'text.keywords'); a stage's peak includes its children.
+    Repeated stages (one per column or chunk) are summed.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._stack = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        checkpoint()
+        emit('stage', stage=name, state='start')
+        if self._stack:
+            # keep the parent's peak so far before the reset below clears it
+            self._stack[-1][1] = max(self._stack[-1][1], peak_rss_mb())
+        _reset_peak_rss()
+        frame = [name, 0.0]
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self._stack.pop()
+            peak = max(frame[1], peak_rss_mb())
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "peak_rss_mb": 0.0, "calls": 0})
+            entry["seconds"] += seconds
+            entry["peak_rss_mb"] = max(entry["peak_rss_mb"], peak)
+            entry["calls"] += 1
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            emit('stage', stage=name, state='end', seconds=round(seconds, 4))
+
+    def as_dict(self, n_rows=None):
+        """The report's '_timings' value"""
+        total = time.perf_counter() - self._start
+        out = {
+            "total_seconds": round(total, 4),
+            "stages": {
+                name: {"seconds": round(e["seconds"], 4), "peak_rss_mb": round(e["peak_rss_mb"], 1), "calls": e["calls"]}
+                for name, e in self.stages.items()
+            },
+        }
+        if n_rows is not None and total > 0:
+            out["rows_per_second"] = round(n_rows / total, 1)
+        return out
+
+
+class _NoTimings:
+    """Stand-in when the caller did not ask for timings"""
+
+    @contextmanager
+    def stage(self, name):
+        checkpoint()
+        emit('stage', stage=name, state='start')
+        try:
+            yield
+        finally:
+            emit('stage', stage=name, state='end')
+
+
+NO_TIMINGS = _NoTimings()
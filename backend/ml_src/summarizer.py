@@ -1,6 +1,7 @@
 from transformers import pipeline
-from textblob import TextBlob
-import numpy as np
+
+from hierarchical import summarize_hierarchical
+from sentiment import get_scorer, sentiment_buckets
 
 # Load summarization model
 summarizer = pipeline("summarization", model="google/flan-t5-base")
@@ -14,32 +15,13 @@ def generate_summary(report):
     if not reviews:
         return {"summary": "No reviews found.", "sentiment_summary": {}}
 
-    # Combine reviews into one text block
-    text = " ".join(reviews)
-    text = text[:3000]  # Keep it within token limits
-
-    # 🔥 Explicit summarization instruction (important!)
-    input_text = "\n" + text
-
-    # Generate concise summary
-    raw_summary = summarizer(
-        input_text,
-        max_length=120,
-        min_length=30,
-        do_sample=False
-    )
-    summary_text = raw_summary[0]["summary_text"].strip()
+    # Summarize chunks of reviews, then the chunk summaries (covers every review)
+    summary_text, _ = summarize_hierarchical(reviews, summarizer, prefix="\n", max_length=120, min_length=30)
 
     # --- Sentiment Analysis ---
-    sentiments = []
-    for r in reviews:
-        blob = TextBlob(r)
-        sentiments.append(blob.sentiment.polarity)
-
-    sentiments = np.array(sentiments)
-    pos = int((sentiments > 0.1).sum())
-    neg = int((sentiments < -0.1).sum())
-    neu = len(sentiments) - pos - neg
+    sentiments, _ = get_scorer().score(reviews)
+    buckets = sentiment_buckets(sentiments)
+    pos, neg, neu = buckets["positive"], buckets["negative"], buckets["neutral"]
 
     overall = (
         "mostly positive" if pos > neg else
@@ -0,0 +1,156 @@
+"""
+Time-bucketed sentiment and engagement trends for datetime columns.
+
+Every timestamp column gets hourly and daily series of row counts,
+sentiment counts (postSentiment labels, or the polarity of the review text)
+and sums of engagement columns (likes, shares, ...). Rows are bucketed with
+pandas resample on a DatetimeIndex, one call per frame; the hourly table is
+mergeable, so chunked mode adds one resampled table per chunk and the daily
+series is resampled from the merged hourly one. Series are returned as
+compact arrays that start at 'start' and step by 'freq'; timestamps are UTC.
+"""
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from sentiment import POSITIVE_THRESHOLD, NEGATIVE_THRESHOLD
+
+SENTIMENT_LABELS = ('positive', 'neutral', 'negative')
+ENGAGEMENT_PATTERN = re.compile(r"likes|engagement|comments|shares|views|reactions", re.IGNORECASE)
+# longest series returned per granularity; longer ones are left out (hourly first)
+MAX_TREND_BUCKETS = 2000
+GRANULARITIES = (('hourly', 'h'), ('daily', 'D'))
+# formats pandas does not infer from a first value (12-hour clocks), tried on the head of a column
+FALLBACK_FORMATS = ('%m/%d/%Y %I:%M:%S %p', '%m/%d/%Y %I:%M %p', '%d/%m/%Y %I:%M:%S %p', '%d/%m/%Y %I:%M %p',
+                    '%Y-%m-%d %I:%M:%S %p', '%Y-%m-%d %I:%M %p', '%b %d, %Y %I:%M %p', '%d %b %Y %I:%M %p')
+FORMAT_SAMPLE_ROWS = 200
+
+
+def _mostly_unparsed(parsed, series):
+    return parsed.notna().sum() * 2 < series.notna().sum()
+
+
+def _infers_format(head):
+    """True if pandas infers one format from the first value (and so parses the column in C)"""
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', UserWarning)
+        pd.to_datetime(head, errors='coerce')
+    return not any('infer format' in str(w.message) for w in caught)
+
+
+def _head_format(head):
+    """First of FALLBACK_FORMATS that parses every value of head, or None"""
+    for fmt in FALLBACK_FORMATS:
+        if pd.to_datetime(head, errors='coerce', format=fmt).notna().all():
+            return fmt
+    return None
+
+
+def parse_datetimes(series: pd.Series) -> pd.Series:
+    """UTC timestamps of a column, NaT where a value does not parse"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.to_datetime(series, utc=True)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # parse each category once and map the codes back
+        categories = pd.DatetimeIndex(parse_datetimes(pd.Series(series.cat.categories.astype(object))))
+        parsed = categories.take(series.cat.codes.to_numpy(), allow_fill=True, fill_value=pd.NaT)
+        return pd.Series(parsed, index=series.index, name=series.name)
+    # ISO 8601, or any single format, is parsed in C; the per-value parser is ~20x slower
+    parsed = pd.to_datetime(series, errors='coerce', utc=True, format='ISO8601')
+    if _mostly_unparsed(parsed, series):
+        head = series.dropna().head(FORMAT_SAMPLE_ROWS)
+        if _infers_format(head):
+            parsed = pd.to_datetime(series, errors='coerce', utc=True)
+        else:
+            fmt = _head_format(head)
+            if fmt is not None:
+                parsed = pd.to_datetime(series, errors='coerce', utc=True, format=fmt)
+    if _mostly_unparsed(parsed, series):
+        # mixed formats: the per-value parser runs once per distinct value
+        values = series.astype(object)
+        distinct = pd.unique(values.dropna())
+        lookup = pd.Series(pd.to_datetime(distinct, errors='coerce', utc=True, format='mixed'), index=distinct)
+        parsed = pd.to_datetime(values.map(lookup), utc=True)
+    return parsed
+
+
+def polarity_labels(polarity):
+    """'positive' / 'negative' / 'neutral' per polarity score, as sentiment_buckets counts them"""
+    polarity = np.asarray(polarity)
+    return np.where(polarity > POSITIVE_THRESHOLD, 'positive',
+                    np.where(polarity < NEGATIVE_THRESHOLD, 'negative', 'neutral'))
+
+
+def engagement_columns(col_types):
+    return [c for c, t in col_types.items() if t == 'numeric' and ENGAGEMENT_PATTERN.search(str(c))]
+
+
+class TrendAccumulator:
+    """Mergeable hourly table of counts, sentiment counts and engagement sums for one datetime column"""
+
+    def __init__(self, column, engagement=(), with_sentiment=True):
+        self.column = column
+        self.engagement = list(engagement)
+        self.with_sentiment = with_sentiment
+        self.hourly = None
+        self.n = 0
+        self.unparsed = 0
+
+    def update(self, frame: pd.DataFrame, sentiment=None):
+        """
+        Add a frame; sentiment holds one label (or NaN) per row of frame, e.g.
+        its postSentiment column or polarity_labels() of its review text.
+        """
+        timestamps = parse_datetimes(frame[self.column])
+        valid = timestamps.notna().to_numpy()
+        self.unparsed += int(frame[self.column].notna().sum() - valid.sum())
+        if not valid.any():
+            return
+        self.n += int(valid.sum())
+        data = {'count': np.ones(int(valid.sum()), dtype='int64')}
+        if self.with_sentiment:
+            labels = np.asarray(sentiment, dtype=object)[valid] if sentiment is not None else None
+            for label in SENTIMENT_LABELS:
+                data[label] = (labels == label).astype('int64') if labels is not None else 0
+        for c in self.engagement:
+            data[c] = pd.to_numeric(frame[c], errors='coerce').to_numpy(dtype='float64')[valid]
+        table = pd.DataFrame(data, index=pd.DatetimeIndex(timestamps[valid])).resample('h').sum()
+        # empty hours are not kept; result() fills them back in
+        self._add(table[table['count'] > 0])
+
+    def merge(self, other: 'TrendAccumulator'):
+        self.n += other.n
+        self.unparsed += other.unparsed
+        if other.hourly is not None:
+            self._add(other.hourly)
+
+    def _add(self, table):
+        self.hourly = table if self.hourly is None else pd.concat([self.hourly, table]).groupby(level=0).sum()
+
+    def result(self):
+        if self.hourly is None:
+            return {'n_timestamps': 0, 'unparsed': self.unparsed}
+        hourly = self.hourly.sort_index()
+        report = {
+            'n_timestamps': self.n,
+            'unparsed': self.unparsed,
+            'first_hour': hourly.index[0].isoformat(),
+            'last_hour': hourly.index[-1].isoformat(),
+        }
+        for name, freq in GRANULARITIES:
+            table = hourly.resample(freq).sum()
+            if len(table) > MAX_TREND_BUCKETS:
+                continue
+            series = {
+                'start': table.index[0].isoformat(),
+                'freq': freq,
+                'count': table['count'].astype('int64').tolist(),
+            }
+            if self.with_sentiment:
+                series['sentiment'] = {label: table[label].astype('int64').tolist() for label in SENTIMENT_LABELS}
+            if self.engagement:
+                series['engagement'] = {c: table[c].astype('float64').tolist() for c in self.engagement}
+            report[name] = series
+        return report
@@ -0,0 +1,156 @@
+"""
+Progress event logs of running analyses, streamed as Server-Sent Events.
+
+Workers append JSON lines to one log per analysis id (see
+ml_src/progress.py). This process opens the log when it submits the
+analysis, remembers who may read it, and appends the final 'done' event
+itself once the analysis has ended, so a crashed or cancelled worker still
+closes the stream. Readers tail the file: every line becomes one SSE event
+whose id is its line number, so a reconnecting EventSource resumes after
+Last-Event-ID instead of starting over.
+"""
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import AsyncIterator, Dict, Optional, Set
+
+ANALYSIS_EVENTS_DIR = os.getenv("ANALYSIS_EVENTS_DIR", os.path.join(tempfile.gettempdir(), "evlens-events"))
+# Logs of finished analyses are kept this long for late or reconnecting readers
+EVENTS_RETENTION_SECONDS = float(os.getenv("EVENTS_RETENTION_SECONDS", "600"))
+
+# How often a stream looks for new lines, and how long it may stay silent
+# before a comment line keeps proxies from timing it out
+EVENTS_POLL_SECONDS = 0.25
+EVENTS_KEEPALIVE_SECONDS = 15.0
+# Reconnect delay suggested to EventSource clients, in milliseconds
+EVENTS_RETRY_MS = 2000
+
+DONE_EVENT = "done"
+
+
+def sse_event(event_id: int, event: str, data: str) -> bytes:
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n".encode()
+
+
+class ProgressLogs:
+    """
+    One JSON-lines file per analysis id. An id analyzed twice at once (the
+    same upload from two requests) shares its log, which is closed when the
+    last run ends.
+    """
+
+    def __init__(self, root: str = ANALYSIS_EVENTS_DIR, retention_seconds: float = EVENTS_RETENTION_SECONDS):
+        self.root = root
+        self.retention_seconds = retention_seconds
+        self._owners: Dict[str, Set[int]] = {}
+        # runs in flight and end time of the last one, per analysis id
+        self._running: Dict[str, int] = {}
+        self._finished: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, analysis_id: str) -> str:
+        return os.path.join(self.root, f"{analysis_id}.jsonl")
+
+    def open(self, analysis_id: str, owner_id: int) -> str:
+        """Start (or join) the log of an analysis about to be submitted; returns its path"""
+        self._prune()
+        with self._lock:
+            if not self._running.get(analysis_id):
+                # a fresh run: drop the events of an earlier one
+                with open(self.path(analysis_id), "w"):
+                    pass
+                self._finished.pop(analysis_id, None)
+                self._owners[analysis_id] = set()
+            self._running[analysis_id] = self._running.get(analysis_id, 0) + 1
+            self._owners[analysis_id].add(owner_id)
+        return self.path(analysis_id)
+
+    def finish(self, analysis_id: str, status: str, error: Optional[str] = None):
+        """
+        Record that one run of analysis_id ended ('completed', 'failed' or
+        'cancelled'); the last one appends the 'done' event
+        """
+        with self._lock:
+            self._running[analysis_id] = self._running.get(analysis_id, 1) - 1
+            if self._running[analysis_id] > 0:
+                return
+            del self._running[analysis_id]
+            self._finished[analysis_id] = time.time()
+            line = {"event": DONE_EVENT, "time": round(time.time(), 3), "status": status, "analysis_id": analysis_id}
+            if error:
+                line["error"] = error
+            with open(self.path(analysis_id), "a", encoding="utf-8") as f:
+                f.write(json.dumps(line) + "\n")
+
+    def readable(self, analysis_id: str, owner_id: int) -> bool:
+        """True if owner_id submitted the analysis and its log is still kept"""
+        with self._lock:
+            return owner_id in self._owners.get(analysis_id, ()) and os.path.exists(self.path(analysis_id))
+
+    async def follow(self, analysis_id: str, request, last_event_id: int = 0) -> AsyncIterator[bytes]:
+        """
+        SSE bytes for every event of the log after last_event_id, then the new
+        ones as the worker writes them, until 'done' or the client leaves
+        """
+        yield f"retry: {EVENTS_RETRY_MS}\n\n".encode()
+        event_id = 0
+        pending = ""
+        quiet_since = time.monotonic()
+        try:
+            f = open(self.path(analysis_id), encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with f:
+            while True:
+                chunk = f.read()
+                if chunk:
+                    pending += chunk
+                    # the worker may be halfway through a line; keep it for the next read
+                    *lines, pending = pending.split("\n")
+                    for line in lines:
+                        if not line:
+                            continue
+                        event_id += 1
+                        try:
+                            event = json.loads(line).get("event", "message")
+                        except ValueError:
+                            continue
+                        if event_id > last_event_id:
+                            quiet_since = time.monotonic()
+                            yield sse_event(event_id, event, line)
+                        if event == DONE_EVENT:
+                            return
+                    continue
+                if await request.is_disconnected():
+                    return
+                if time.monotonic() - quiet_since >= EVENTS_KEEPALIVE_SECONDS:
+                    quiet_since = time.monotonic()
+                    yield b": keepalive\n\n"
+                await asyncio.sleep(EVENTS_POLL_SECONDS)
+
+    def _prune(self):
+        """Delete the logs of analyses that ended (or were last written) before the retention window"""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            for name in os.listdir(self.root):
+                analysis_id = name[:-len(".jsonl")]
+                if analysis_id in self._running:
+                    continue
+                try:
+                    last_used = self._finished.get(analysis_id) or os.path.getmtime(self.path(analysis_id))
+                except OSError:
+                    continue
+                if last_used < cutoff:
+                    self._finished.pop(analysis_id, None)
+                    self._owners.pop(analysis_id, None)
+                    try:
+                        os.remove(self.path(analysis_id))
+                    except FileNotFoundError:
+                        pass
+
+
+progress_logs = ProgressLogs()
@@ -0,0 +1,82 @@
+"""
+Fast JSON responses for large reports.
+
+Reports are plain dicts that can hold numpy scalars and arrays. Returning
+them through a response_model makes FastAPI re-validate the whole tree with
+pydantic, walk it again with jsonable_encoder and then json.dumps it. Here
+they are serialized once with orjson (numpy types natively) and compressed
+with brotli or gzip, whichever the client accepts, in a worker thread so the
+event loop keeps serving other requests. Endpoints keep their response_model
+for the OpenAPI schema; a returned Response bypasses it.
+"""
+import gzip
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+# bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+# fast settings: most of the size win of the higher levels at a fraction of the CPU
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes of content; numpy values are native, NaN becomes null, other types fall back to str()"""
+    return orjson.dumps(content, default=str, option=ORJSON_OPTIONS)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """'br', 'gzip' or None for an Accept-Encoding header; the highest q wins, brotli on ties"""
+    preference = {"br": 2, "gzip": 1} if BROTLI_AVAILABLE else {"gzip": 1}
+    best, best_rank = None, (0.0, 0)
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        candidates = preference if name == "*" else ([name] if name in preference else [])
+        for candidate in candidates:
+            rank = (q, preference[candidate])
+            if q > 0 and rank > best_rank:
+                best, best_rank = candidate, rank
+    return best
+
+
+def encode(content: Any, encoding: Optional[str] = None) -> Tuple[bytes, Optional[str]]:
+    """(body, content encoding actually applied)"""
+    body = dumps(content)
+    if encoding is None or len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), "gzip"
+
+
+async def json_response(request: Request, content: Any, status_code: int = 200,
+                        headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serialize and (if the client accepts it) compress content off the event loop"""
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    body, applied = await run_in_threadpool(encode, content, encoding)
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    if applied:
+        headers["Content-Encoding"] = applied
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,111 @@
+"""
+Content-addressed on-disk cache of analysis results
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, Optional
+
+import orjson
+
+from responses import dumps
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join("cache", "results"))
+RESULT_CACHE_MAX_MB = float(os.getenv("RESULT_CACHE_MAX_MB", "256"))
+
+
+class ResultCache:
+    """
+    Size-bounded LRU of {"report", "summary"} results stored as JSON files.
+    Keys are the upload's content hash plus the pipeline version, so a new
+    pipeline version never serves stale results.
+    """
+
+    def __init__(self, cache_dir: str = RESULT_CACHE_DIR, max_bytes: int = int(RESULT_CACHE_MAX_MB * 1024 * 1024)):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, float]] = {}
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_index(self):
+        """Rebuild the LRU index from files left by a previous run"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                self._entries[name[:-5]] = {"size": stat.st_size, "last_used": stat.st_mtime}
+
+    @property
+    def total_bytes(self) -> int:
+        return int(sum(entry["size"] for entry in self._entries.values()))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for key, or None"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), "rb") as f:
+                    value = orjson.loads(f.read())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable cache entry {key}: {e}")
+                self._remove(key)
+                self.misses += 1
+                return None
+            now = time.time()
+            self._entries[key]["last_used"] = now
+            os.utime(self._path(key), (now, now))
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store value under key, evicting least recently used entries if needed"""
+        data = dumps(value)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            self._entries[key] = {"size": len(data), "last_used": time.time()}
+            self._evict()
+
+    def _evict(self):
+        total = self.total_bytes
+        for key in sorted(self._entries, key=lambda k: self._entries[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= self._entries[key]["size"]
+            self._remove(key)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        self._entries.pop(key, None)
+        if os.path.exists(self._path(key)):
+            os.remove(self._path(key))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+result_cache = ResultCache()
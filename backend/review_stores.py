@@ -0,0 +1,104 @@
+"""
+On-disk review stores behind analyses, paged through the API
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+try:
+    from ml_service import get_pipeline
+except ImportError:
+    from backend.ml_service import get_pipeline
+
+logger = logging.getLogger(__name__)
+
+REVIEW_STORE_DIR = os.getenv("REVIEW_STORE_DIR", os.path.join("cache", "reviews"))
+# Stores not read or re-uploaded for this long are deleted
+REVIEW_STORE_RETENTION_HOURS = float(os.getenv("REVIEW_STORE_RETENTION_HOURS", "24"))
+
+OWNERS_FILE = "owners.json"
+ANALYSIS_ID_PATTERN = re.compile(r"[0-9a-f]{64}-v\w+")
+
+
+class ReviewStores:
+    """
+    One directory per analysis id (the upload's cache key), written by the
+    worker in ml_src/review_store.py layout. Only users who uploaded the file
+    may page through its reviews.
+    """
+
+    def __init__(self, root: str = REVIEW_STORE_DIR, retention_seconds: float = REVIEW_STORE_RETENTION_HOURS * 3600):
+        self.root = root
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, analysis_id: str) -> str:
+        return os.path.join(self.root, analysis_id)
+
+    def exists(self, analysis_id: str) -> bool:
+        if not ANALYSIS_ID_PATTERN.fullmatch(analysis_id):
+            return False
+        return os.path.exists(os.path.join(self.path(analysis_id), "columns.json"))
+
+    def _owners(self, analysis_id: str) -> List[int]:
+        try:
+            with open(os.path.join(self.path(analysis_id), OWNERS_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def grant(self, analysis_id: str, owner_id: int):
+        """Allow owner_id to read the store and mark it as recently used"""
+        with self._lock:
+            if not self.exists(analysis_id):
+                return
+            owners = self._owners(analysis_id)
+            if owner_id not in owners:
+                owners.append(owner_id)
+            with open(os.path.join(self.path(analysis_id), OWNERS_FILE), "w") as f:
+                json.dump(owners, f)
+        self._prune()
+
+    def readable(self, analysis_id: str, owner_id: int) -> bool:
+        return self.exists(analysis_id) and owner_id in self._owners(analysis_id)
+
+    def page(self, analysis_id: str, owner_id: int, column: Optional[str], offset: int, limit: int) -> Optional[Dict[str, Any]]:
+        """
+        Return {'column', 'total', 'reviews'} for one page, or None if the store
+        is missing, not readable by owner_id or has no such column.
+        """
+        if not self.readable(analysis_id, owner_id):
+            return None
+        stages = get_pipeline()
+        store_dir = self.path(analysis_id)
+        columns = stages["store_columns"](store_dir)
+        if column is None and columns:
+            column = next(iter(columns))
+        if column not in columns:
+            return None
+        now = time.time()
+        os.utime(os.path.join(store_dir, OWNERS_FILE), (now, now))
+        total, reviews = stages["read_reviews"](store_dir, column, offset, limit)
+        return {"column": column, "total": total, "reviews": reviews}
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for name in os.listdir(self.root):
+            store_dir = os.path.join(self.root, name)
+            marker = os.path.join(store_dir, OWNERS_FILE)
+            try:
+                last_used = os.path.getmtime(marker if os.path.exists(marker) else store_dir)
+            except OSError:
+                continue
+            if last_used < cutoff:
+                logger.info(f"Removing expired review store {name}")
+                shutil.rmtree(store_dir, ignore_errors=True)
+
+
+review_stores = ReviewStores()
@@ -2,7 +2,7 @@
 Pydantic schemas for request/response validation
 """
 from pydantic import BaseModel, EmailStr, ConfigDict
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 
@@ -30,4 +30,31 @@ class AnalysisResponse(BaseModel):
     report: Dict[str, Any]
     summary: Dict[str, Any]
     message: str
+    analysis_id: Optional[str] = None
 
+
+class ReviewPage(BaseModel):
+    analysis_id: str
+    column: str
+    offset: int
+    limit: int
+    total: int
+    reviews: List[str]
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+    # for GET /api/analyses/{analysis_id}/events while the job runs
+    analysis_id: Optional[str] = None
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str
+    analysis_id: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    report: Optional[Dict[str, Any]] = None
+    summary: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
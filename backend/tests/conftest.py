@@ -0,0 +1,11 @@
+"""
+Make the backend modules and the analyzer sources importable, the same way
+the app does (ml_service puts ml_src on sys.path at startup).
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (BACKEND_DIR, os.path.join(BACKEND_DIR, "ml_src")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
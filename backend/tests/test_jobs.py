@@ -0,0 +1,85 @@
+"""
+Cancelling a background job frees its pool worker: DELETE /api/jobs/{id} on
+a running analysis ends its future in AnalysisCancelled, and the same
+single-worker pool then completes the next job.
+"""
+import os
+import tempfile
+import time
+
+import pytest
+
+STATE_DIR = tempfile.mkdtemp(prefix="evlens-test-")
+os.environ["ANALYSIS_WORKERS"] = "1"
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(STATE_DIR, 'test.db')}"
+for name in ("RESULT_CACHE_DIR", "REVIEW_STORE_DIR", "ANALYSIS_EVENTS_DIR", "ANALYSIS_CANCEL_DIR"):
+    os.environ[name] = os.path.join(STATE_DIR, name.lower())
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from jobs import job_manager  # noqa: E402
+from ml_service import get_pipeline  # noqa: E402
+from benchmarks.synthetic import write_dataset  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SMALL_FILE = os.path.join(BACKEND_DIR, "..", "sample_event_reviews.csv")
+# rows of the analysis that gets cancelled; takes several seconds to analyze
+LONG_ROWS = 20000
+# cancellation is checked at every stage, per chunk and per sentiment batch
+CANCEL_BOUND_SECONDS = 10.0
+JOB_BOUND_SECONDS = 120.0
+
+
+def wait_for(predicate, timeout):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def worker_pids():
+    return sorted(job_manager._executor._processes)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # uploads are written under the working directory
+    monkeypatch.chdir(tmp_path)
+    with TestClient(main.app) as c:
+        c.post("/api/auth/register", json={"email": "jobs@test.com", "username": "jobs", "password": "secret"})
+        token = c.post(
+            "/api/auth/login", data={"username": "jobs@test.com", "password": "secret"}
+        ).json()["access_token"]
+        c.headers["Authorization"] = f"Bearer {token}"
+        yield c
+
+
+def test_cancelled_job_frees_its_worker(client, tmp_path):
+    assert job_manager.max_workers == 1
+    long_file = write_dataset("instagram", LONG_ROWS, str(tmp_path / "long.csv"))
+
+    with open(long_file, "rb") as f:
+        response = client.post("/api/jobs", files={"file": ("long.csv", f)})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    future = job_manager.get(job_id)["_task"].future
+    assert wait_for(lambda: client.get(f"/api/jobs/{job_id}").json()["status"] == "running", JOB_BOUND_SECONDS)
+    pids = worker_pids()
+
+    start = time.monotonic()
+    assert client.delete(f"/api/jobs/{job_id}").status_code == 202
+    assert wait_for(future.done, CANCEL_BOUND_SECONDS)
+    assert time.monotonic() - start < CANCEL_BOUND_SECONDS
+    assert isinstance(future.exception(), get_pipeline()["cancelled_error"])
+    assert client.get(f"/api/jobs/{job_id}").json()["status"] == "cancelled"
+
+    with open(SMALL_FILE, "rb") as f:
+        response = client.post("/api/jobs", files={"file": ("small.csv", f)})
+    job_id = response.json()["job_id"]
+    assert wait_for(lambda: client.get(f"/api/jobs/{job_id}").json()["status"] == "completed", JOB_BOUND_SECONDS)
+    # the same worker process took the new job; nothing was killed or respawned
+    assert worker_pids() == pids
@@ -0,0 +1,54 @@
+"""
+Parity of BatchSentimentScorer with TextBlob(text).sentiment.polarity on the
+sample CSVs.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from textblob import TextBlob
+
+from analyzer import detect_columns
+from sentiment import get_scorer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_FILES = [
+    os.path.join(BACKEND_DIR, "..", "sample_event_reviews.csv"),
+    os.path.join(BACKEND_DIR, "..", "sample_event_reviews_mixed_sentiment.csv"),
+    os.path.join(BACKEND_DIR, "..", "sample_event_reviews_small.csv"),
+    os.path.join(BACKEND_DIR, "sample_data", "demo_instagram_data.csv"),
+    os.path.join(BACKEND_DIR, "sample_data", "techvistara_demo.csv"),
+]
+
+# Texts the batched scorer is documented to score differently (see the
+# sentiment.py docstring): a modifier in front of a negation. TextBlob gives
+# "Really not good" -0.35, the batched scorer -0.075.
+KNOWN_DIVERGENCES = {
+    "Really not good",
+}
+
+
+def sample_texts(path):
+    df = pd.read_csv(path)
+    texts = []
+    for col, kind in detect_columns(df).items():
+        if kind == "text":
+            texts.extend(df[col].dropna().astype(str).tolist())
+    return texts
+
+
+@pytest.mark.parametrize("path", SAMPLE_FILES, ids=os.path.basename)
+def test_polarity_matches_textblob(path):
+    texts = [t for t in sample_texts(path) if t not in KNOWN_DIVERGENCES]
+    assert texts
+    polarity, _ = get_scorer().score(texts)
+    reference = np.array([TextBlob(t).sentiment.polarity for t in texts])
+    np.testing.assert_allclose(polarity, reference, rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("text", sorted(KNOWN_DIVERGENCES))
+def test_known_divergences_still_diverge(text):
+    # a fix to the scorer should shrink KNOWN_DIVERGENCES, not leave stale entries
+    polarity, _ = get_scorer().score([text])
+    assert abs(polarity[0] - TextBlob(text).sentiment.polarity) > 1e-9
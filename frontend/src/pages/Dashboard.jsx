@@ -38,6 +38,9 @@ import {
   Line,
 } from 'recharts'
 
+// Columnar formats are read server-side with pyarrow; compressed CSVs are decompressed while parsing
+const UPLOAD_EXTENSIONS = /\.(csv(\.(gz|bz2|zst))?|parquet|pq|feather|arrow|ipc)$/i
+
 const Dashboard = () => {
   const { user, logout } = useAuth()
   const [file, setFile] = useState(null)
@@ -52,12 +55,12 @@ const Dashboard = () => {
 
   const handleFileChange = (e) => {
     const selectedFile = e.target.files[0]
-    if (selectedFile && selectedFile.type === 'text/csv') {
+    if (selectedFile && (selectedFile.type === 'text/csv' || UPLOAD_EXTENSIONS.test(selectedFile.name))) {
       setFile(selectedFile)
       setError('')
       setResults(null)
     } else {
-      setError('Please upload a valid CSV file')
+      setError('Please upload a CSV (or .csv.gz/.bz2/.zst), Parquet, Feather or Arrow file')
       setFile(null)
     }
   }
@@ -557,13 +560,13 @@ const Dashboard = () => {
                       <p className="text-sm text-gray-700 mb-1">
                         Click to upload or drag and drop
                       </p>
-                      <p className="text-xs text-gray-500">CSV files only</p>
+                      <p className="text-xs text-gray-500">CSV (plain or .gz/.bz2/.zst), Parquet, Feather or Arrow files</p>
                     </div>
                   )}
                   <input
                     type="file"
                     className="hidden"
-                    accept=".csv"
+                    accept=".csv,.gz,.bz2,.zst,.parquet,.pq,.feather,.arrow,.ipc"
                     onChange={handleFileChange}
                   />
                 </div>